@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for running the RAGmail API with several workers (Linux/macOS).
+
+    cd backend
+    gunicorn main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app) and the embedding model
+is loaded there before the workers fork, so its weights are shared
+copy-on-write. Workers open the index read-only; with
+RAGMAIL_VECTOR_BACKEND=numpy the embedding matrix is a memory-mapped file
+whose pages are shared by every worker as well.
+"""
+
+import os
+
+# Fast tokenizers and torch thread pools don't survive fork; keep them off until workers run
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+os.environ.setdefault("RAGMAIL_PRELOAD", "true")
+
+bind = os.getenv("RAGMAIL_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("RAGMAIL_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# LLM calls can wait on rate limits; don't kill workers that are only waiting
+timeout = int(os.getenv("RAGMAIL_WORKER_TIMEOUT", "180"))
+graceful_timeout = 30
+
+
+def on_starting(server):
+    if workers > 1 and os.getenv("RAGMAIL_VECTOR_BACKEND", "chroma").lower() == "chroma":
+        server.log.warning(
+            "Each worker loads its own copy of the Chroma index; set "
+            "RAGMAIL_VECTOR_BACKEND=numpy to share one memory-mapped index."
+        )
+
+
+def post_fork(server, worker):
+    # The LLM quota belongs to the API key, not the process: give each worker its share
+    for name, default in (("RAGMAIL_LLM_RPM", "30"), ("RAGMAIL_LLM_TPM", "12000")):
+        os.environ[name] = str(float(os.getenv(name, default)) / workers)
+    
+    # Split the cores between workers instead of every worker using all of them
+    threads = int(os.getenv("RAGMAIL_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
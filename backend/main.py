@@ -1,8 +1,13 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
 from contextlib import asynccontextmanager
+import asyncio
+import io
+import json
+import math
 import sys
 import os
 
@@ -10,22 +15,77 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.email_generator import EmailGenerator
+from src.email_store import EmailStore
+from src.batch import generate_batch, default_output_path, DEFAULT_CONCURRENCY, MAX_BATCH_CONCURRENCY
+from src.jobs import JobStore, JobWorkerPool, job_store_from_env
+from src import metrics
+from src.llm_scheduler import LLMRateLimitError
+
+def preload(load_model: bool = True):
+    """
+    Load shared, read-only state before a pre-forking server starts its workers.
+    
+    Imports the LangChain/transformers/torch stack and the embedding weights
+    (no inference, threads or SQLite connections), so every worker shares them
+    copy-on-write. Each worker still builds its own EmailGenerator in the
+    lifespan handler.
+    """
+    import src.rag_chain  # noqa: F401  (pulls in LangChain, transformers and torch)
+    if load_model:
+        from src.vector_store import preload_embedding_model
+        preload_embedding_model()
+    print("✓ Models and libraries preloaded before forking workers")
+
+# Set by gunicorn.conf.py (preload_app = True), where this module is imported once in the master
+if os.getenv("RAGMAIL_PRELOAD", "false").lower() in ("1", "true", "yes"):
+    preload()
+
+# Clients may reuse the list this long, then revalidate with If-None-Match
+PROJECTS_MAX_AGE = int(os.getenv("RAGMAIL_PROJECTS_MAX_AGE", "60"))
+_projects_body = ("", b"")
 
 # Initialize email generator
 email_generator = None
+warmup_task: Optional[asyncio.Task] = None
+warmup_error: Optional[str] = None
+job_store: Optional[JobStore] = None
+job_workers: Optional[JobWorkerPool] = None
+
+async def warm_up_generator():
+    """Load the embedding model and vector store in the background."""
+    global warmup_error
+    try:
+        await asyncio.to_thread(email_generator.warm_up)
+        print("✓ RAGmail Email Generator warmed up and ready!")
+    except Exception as e:
+        warmup_error = str(e)
+        print(f"✗ Failed to warm up Email Generator: {warmup_error}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown"""
-    global email_generator
-    try:
-        email_generator = EmailGenerator()
-        print("✓ RAGmail Email Generator initialized successfully!")
-    except Exception as e:
-        print(f"✗ Failed to initialize Email Generator: {str(e)}")
-        raise
+    global email_generator, warmup_task, job_store, job_workers
+    # Construction is cheap: models and the vector store load lazily, so the
+    # server starts answering immediately while warm-up runs in the background.
+    email_generator = EmailGenerator()
+    print("✓ RAGmail Email Generator initialized successfully!")
+    if os.getenv("RAGMAIL_WARMUP", "true").lower() in ("1", "true", "yes"):
+        warmup_task = asyncio.create_task(warm_up_generator())
+    # Queued jobs (including ones interrupted by a previous shutdown or crash) resume here
+    job_store = job_store_from_env()
+    worker_count = int(os.getenv("RAGMAIL_JOB_WORKERS", "2"))
+    if worker_count > 0:
+        job_workers = JobWorkerPool(job_store, get_generator, workers=worker_count)
+        job_workers.start()
     yield
     # Cleanup on shutdown
+    if job_workers is not None:
+        await job_workers.stop()
+        job_workers = None
+    job_store.close()
+    job_store = None
+    if warmup_task is not None:
+        warmup_task.cancel()
     email_generator = None
 
 app = FastAPI(title="RAGmail API", version="1.0.0", lifespan=lifespan)
@@ -40,23 +100,30 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Initialize email generator
-email_generator = None
-
-async def lifespan(app: FastAPI):
-    """Lifespan event handler for startup and shutdown"""
-    global email_generator
-    try:
-        email_generator = EmailGenerator()
-        print("✓ RAGmail Email Generator initialized successfully!")
-    except Exception as e:
-        print(f"✗ Failed to initialize Email Generator: {str(e)}")
-        raise
-    yield
-    # Cleanup on shutdown
-    email_generator = None
+def generator_status() -> str:
+    """One of: unavailable, warming, failed, ready, cold (loads on first request)."""
+    if email_generator is None:
+        return "unavailable"
+    if warmup_task is not None and not warmup_task.done():
+        return "warming"
+    if warmup_error is not None:
+        return "failed"
+    return "ready" if email_generator.ready else "cold"
 
-app = FastAPI(title="RAGmail API", version="1.0.0", lifespan=lifespan)
+async def get_generator() -> EmailGenerator:
+    """Return the email generator once it is warmed up (waiting if needed)."""
+    if email_generator is None:
+        raise HTTPException(status_code=503, detail="Email generator not initialized")
+    if warmup_task is not None and not warmup_task.done():
+        await asyncio.shield(warmup_task)
+    if warmup_error is not None:
+        raise HTTPException(status_code=503, detail=f"Email generator failed to start: {warmup_error}")
+    if not email_generator.ready:
+        try:
+            await asyncio.to_thread(email_generator.warm_up)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Email generator failed to start: {str(e)}")
+    return email_generator
 
 class ProfessorRequest(BaseModel):
     professor_name: str
@@ -65,13 +132,99 @@ class ProfessorRequest(BaseModel):
     paper_title: Optional[str] = None
     paper_summary: Optional[str] = None
     force_project: Optional[str] = None
+    regenerate: bool = False
 
 class EmailResponse(BaseModel):
     email: str
     selected_project: str
-    relevance_score: int
+    relevance_score: Optional[int] = None
     success: bool
     message: str
+    timings_ms: Optional[Dict[str, float]] = None
+    tokens: Optional[Dict[str, int]] = None
+    stored: bool = False
+    email_id: Optional[int] = None
+
+class BatchRequest(BaseModel):
+    professors: List[ProfessorRequest]
+    # Bounded per request: the LLM scheduler caps LLM calls, not embedding or SQLite work
+    concurrency: int = Field(min(DEFAULT_CONCURRENCY, MAX_BATCH_CONCURRENCY), ge=1, le=MAX_BATCH_CONCURRENCY)
+
+class BatchResult(BaseModel):
+    row: int
+    professor_name: Optional[str] = None
+    success: bool
+    result: Optional[EmailResponse] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+    succeeded: int
+    failed: int
+    output_file: str
+
+class JobRequest(BaseModel):
+    professors: List[ProfessorRequest]
+    idempotency_key: Optional[str] = None
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    existing: bool
+
+class JobResult(BatchResult):
+    reused: bool = False
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    pending: int
+    running: int
+    succeeded: int
+    failed: int
+    results: List[JobResult]
+
+def to_job_status(job: dict) -> JobStatus:
+    """Convert a JobStore job into the API response model."""
+    counts = job["counts"]
+    return JobStatus(
+        job_id=job["job_id"],
+        status=job["status"],
+        total=job["total"],
+        pending=counts["pending"],
+        running=counts["running"],
+        succeeded=counts["done"],
+        failed=counts["failed"],
+        results=[
+            JobResult(
+                row=record["row"],
+                professor_name=record["professor_name"],
+                success=record["success"],
+                reused=record["reused"],
+                result=to_email_response(record["email"]) if record["success"] else None,
+                error=record.get("error")
+            )
+            for record in job["results"]
+        ]
+    )
+
+def to_email_response(result: dict) -> EmailResponse:
+    """Convert an EmailGenerator result dict into the API response model."""
+    metadata = result['metadata']
+    score = metadata.get('relevance_score')
+    return EmailResponse(
+        email=f"Subject: {result['subject']}\n\n{result['body']}",
+        selected_project=metadata['selected_project'],
+        relevance_score=score if isinstance(score, int) else None,
+        success=True,
+        message="Stored email returned" if metadata.get('stored') else "Email generated successfully",
+        timings_ms=metadata.get('timings_ms'),
+        tokens=metadata.get('tokens'),
+        stored=bool(metadata.get('stored')),
+        email_id=metadata.get('email_id')
+    )
 
 @app.get("/")
 async def root():
@@ -85,67 +238,243 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Detailed health check"""
+    status = generator_status()
     return {
-        "status": "healthy",
-        "email_generator_ready": email_generator is not None,
-        "vector_db_loaded": email_generator is not None
+        "status": status,
+        "email_generator_ready": status == "ready",
+        "vector_db_loaded": status == "ready"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-stage latency histograms, LLM tokens and cache lookups"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/api/generate-email", response_model=EmailResponse)
 async def generate_email(request: ProfessorRequest):
     """
     Generate a personalized email for a professor based on their research interests
     """
-    if email_generator is None:
-        raise HTTPException(status_code=503, detail="Email generator not initialized")
+    generator = await get_generator()
     
     try:
-        # Generate the email
-        result = email_generator.generate_email(
+        # Generate the email without blocking the event loop
+        result = await generator.agenerate_email(
             professor_name=request.professor_name,
             university_name=request.university_name,
             research_domain=request.research_domain,
             paper_title=request.paper_title,
             paper_summary=request.paper_summary,
-            force_project=request.force_project
+            use_specific_project=request.force_project,
+            regenerate=request.regenerate
         )
         
-        return EmailResponse(
-            email=result['email'],
-            selected_project=result['project_title'],
-            relevance_score=result['relevance_score'],
-            success=True,
-            message="Email generated successfully"
-        )
+        return to_email_response(result)
     
+    except ValueError as e:
+        # e.g. an unknown force_project
+        raise HTTPException(status_code=400, detail=str(e))
+    except LLMRateLimitError as e:
+        # Still rate-limited after the scheduler's retries: tell the client when to come back
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after or 30))}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate email: {str(e)}"
         )
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/generate-email/stream")
+async def generate_email_stream(request: ProfessorRequest):
+    """
+    Stream email generation as server-sent events:
+    'selection' (project + relevance score), then 'token' (paragraph chunks),
+    then 'email' (the final EmailResponse). Failures are sent as 'error'.
+    """
+    generator = await get_generator()
+    
+    async def events():
+        try:
+            async for event, data in generator.astream_email(
+                professor_name=request.professor_name,
+                university_name=request.university_name,
+                research_domain=request.research_domain,
+                paper_title=request.paper_title,
+                paper_summary=request.paper_summary,
+                use_specific_project=request.force_project,
+                regenerate=request.regenerate
+            ):
+                if event == "email":
+                    data = to_email_response(data).model_dump()
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Failed to generate email: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/generate-emails/batch", response_model=BatchResponse)
+async def generate_emails_batch(request: BatchRequest):
+    """
+    Generate emails for many professors with bounded concurrency.
+    A failing row is reported in its result instead of failing the batch.
+    """
+    generator = await get_generator()
+    
+    output_path = default_output_path()
+    records = await generate_batch(
+        generator,
+        [professor.model_dump() for professor in request.professors],
+        output_path=str(output_path),
+        concurrency=request.concurrency
+    )
+    
+    results = [
+        BatchResult(
+            row=record["row"],
+            professor_name=record["professor_name"],
+            success=record["success"],
+            result=to_email_response(record["email"]) if record["success"] else None,
+            error=record.get("error")
+        )
+        for record in records
+    ]
+    succeeded = sum(1 for r in results if r.success)
+    return BatchResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        output_file=str(output_path)
+    )
+
+def get_email_store() -> EmailStore:
+    if email_generator is None:
+        raise HTTPException(status_code=503, detail="Email generator not initialized")
+    if email_generator.email_store is None:
+        raise HTTPException(status_code=404, detail="The email store is disabled (RAGMAIL_EMAIL_STORE=false)")
+    return email_generator.email_store
+
+@app.get("/api/emails")
+async def list_emails(limit: int = 50, offset: int = 0, professor: Optional[str] = None, all_versions: bool = False):
+    """Stored emails, newest first (only the latest version per professor request unless all_versions)"""
+    store = get_email_store()
+    total = await asyncio.to_thread(store.count)
+    emails = await asyncio.to_thread(
+        store.list, limit=min(limit, 500), offset=offset, professor=professor, latest_only=not all_versions
+    )
+    return {"total": total, "emails": emails}
+
+@app.get("/api/emails/export")
+async def export_emails(format: str = "jsonl", all_versions: bool = False):
+    """Download every stored email as JSONL or CSV"""
+    store = get_email_store()
+    if format not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+    buffer = io.StringIO(newline='')
+    await asyncio.to_thread(store.dump, buffer, format, not all_versions)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return Response(
+        content=buffer.getvalue(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="emails.{format}"'}
+    )
+
+def get_job_store() -> JobStore:
+    if job_store is None:
+        raise HTTPException(status_code=503, detail="Job queue not initialized")
+    return job_store
+
+@app.post("/api/jobs", response_model=JobSubmitted, status_code=202)
+async def submit_job(request: JobRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Queue a batch generation and return its job ID immediately.
+    
+    With an idempotency key (Idempotency-Key header or body field), resubmitting
+    the same rows returns the existing job, and a changed submission reuses the
+    rows already generated under that key.
+    """
+    store = get_job_store()
+    job_id, existing = await asyncio.to_thread(
+        store.submit,
+        [professor.model_dump() for professor in request.professors],
+        idempotency_key=idempotency_key or request.idempotency_key
+    )
+    job = await asyncio.to_thread(store.get, job_id, include_results=False)
+    return JobSubmitted(job_id=job_id, status=job["status"], total=job["total"], existing=existing)
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Job progress with the rows finished so far"""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return to_job_status(job)
+
+@app.get("/api/jobs/{job_id}/results", response_model=JobStatus)
+async def get_job_results(job_id: str):
+    """All results of a completed job (409 while rows are still queued or running)"""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if job["status"] != "completed":
+        done = job["counts"]["done"] + job["counts"]["failed"]
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} ({done}/{job['total']} rows finished)")
+    return to_job_status(job)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the given (quoted) ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
 @app.get("/api/projects")
-async def get_projects():
-    """Get list of all available projects"""
-    import json
+async def get_projects(request: Request):
+    """Get list of all available projects (ETag-validated; unchanged lists return 304)"""
+    global _projects_body
+    
+    if email_generator is None:
+        raise HTTPException(status_code=503, detail="Email generator not initialized")
+    # The generator's catalog, so the list always matches what retrieval indexes
+    catalog = email_generator.loader.catalog
+    try:
+        projects, version = catalog.snapshot()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Project catalog not found: {catalog.path}")
     
     try:
-        with open(os.path.join(os.path.dirname(__file__), 'data', 'projects.json'), 'r') as f:
-            projects = json.load(f)
+        etag = f'"{version}"'
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={PROJECTS_MAX_AGE}, must-revalidate"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        # Return simplified project list
-        return {
-            "success": True,
-            "projects": [
-                {
-                    "id": p["id"],
-                    "title": p["title"],
-                    "domain": p["domain"],
-                    "description": p["description"]
-                }
-                for p in projects
-            ]
-        }
+        cached_version, body = _projects_body
+        if cached_version != version:
+            # Return simplified project list, serialized once per catalog change
+            body = json.dumps({
+                "success": True,
+                "projects": [
+                    {
+                        "id": p["id"],
+                        "title": p["title"],
+                        "domain": p["domain"],
+                        "description": p["description"]
+                    }
+                    for p in projects
+                ]
+            }).encode("utf-8")
+            _projects_body = (version, body)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         raise HTTPException(
             status_code=500,
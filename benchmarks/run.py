@@ -0,0 +1,457 @@
+"""
+End-to-end benchmarks for the RAGmail pipeline.
+
+Measures index builds over synthetic corpora, query embedding latency,
+search_projects_only latency per corpus size, recall@k and footprint of the
+quantized numpy index against float32, EmailGenerator.generate_email
+latency against the fake LLM provider, and /api/generate-email throughput
+under concurrency. Results are written as JSON and can be compared against a
+previous run with --baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 50 500 2000 --embeddings hash --baseline benchmarks/results/base.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import write_dataset, make_queries, HashingEmbeddingEngine, use_embeddings
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def quiet():
+    """Swallow the pipeline's progress prints while timing."""
+    return redirect_stdout(io.StringIO())
+
+
+class BenchmarkRunner:
+    """Builds one synthetic workspace per corpus size and runs the benchmarks against them."""
+
+    def __init__(self, args: argparse.Namespace, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        self.queries = make_queries(args.queries)
+        self.stores: Dict[int, object] = {}
+
+    def workspace(self, size: int) -> Path:
+        """Directory holding data/ and chroma_db/ for one corpus size."""
+        return self.workdir / f"n{size}"
+
+    def engine(self):
+        """The hashing engine for offline runs, or None to keep the real model."""
+        if self.args.embeddings == "hash":
+            return HashingEmbeddingEngine()
+        return None
+
+    def new_store(self, size: int):
+        from src.vector_store import RAGmailVectorStore
+        store = RAGmailVectorStore(
+            persist_directory=str(self.workspace(size) / "chroma_db"),
+            backend=self.args.backend
+        )
+        engine = self.engine()
+        if engine is not None:
+            use_embeddings(store, engine)
+        return store
+
+    def bench_index_build(self) -> Dict:
+        """Full build and no-op incremental resync for each corpus size."""
+        from src.document_loader import RAGmailDocumentLoader
+        from src.indexer import IncrementalIndexer
+
+        results = {}
+        for size in self.args.sizes:
+            data_dir = self.workspace(size) / "data"
+            write_dataset(str(data_dir), size)
+            loader = RAGmailDocumentLoader(str(data_dir))
+            store = self.new_store(size)
+            indexer = IncrementalIndexer(loader, store)
+
+            with quiet():
+                start = time.perf_counter()
+                indexer.sync(full=True)
+                build_seconds = time.perf_counter() - start
+                documents = store.embeddings.last_stats.get("documents", 0)
+                start = time.perf_counter()
+                indexer.sync()
+                resync_seconds = time.perf_counter() - start
+
+            self.stores[size] = store
+            results[f"n{size}"] = {
+                "projects": size,
+                "documents": documents,
+                "build_seconds": round(build_seconds, 4),
+                "build_docs_per_sec": round(documents / build_seconds, 2) if build_seconds else 0.0,
+                "resync_seconds": round(resync_seconds, 4)
+            }
+            print(f"  index n={size}: {build_seconds:.2f}s build, {resync_seconds:.2f}s no-op resync")
+        return results
+
+    def bench_query_embedding(self) -> Dict:
+        """Raw encoder latency, then the same queries through the embedding cache."""
+        store = self.stores[self.args.sizes[0]]
+        store.embeddings.embed_query("warm-up")
+
+        uncached = []
+        for query in self.queries:
+            start = time.perf_counter()
+            store.embeddings.embed_query(query)
+            uncached.append(time.perf_counter() - start)
+
+        for query in self.queries:
+            store.embed_query(query)
+        cached = []
+        for query in self.queries:
+            start = time.perf_counter()
+            store.embed_query(query)
+            cached.append(time.perf_counter() - start)
+
+        results = {"uncached": summarize(uncached), "cached": summarize(cached)}
+        print(f"  query embedding: {results['uncached']['p50_ms']}ms uncached, "
+              f"{results['cached']['p50_ms']}ms cached (p50)")
+        return results
+
+    def bench_search(self) -> Dict:
+        """search_projects_only latency per corpus size (query embeddings warm in cache)."""
+        results = {}
+        for size in self.args.sizes:
+            store = self.stores[size]
+            with quiet():
+                store.load_vectorstore()
+                for query in self.queries:
+                    store.search_projects_only(query, k=self.args.k)
+
+            samples = []
+            for _ in range(self.args.search_rounds):
+                for query in self.queries:
+                    start = time.perf_counter()
+                    store.search_projects_only(query, k=self.args.k)
+                    samples.append(time.perf_counter() - start)
+            results[f"n{size}"] = summarize(samples)
+            print(f"  search n={size}: p50 {results[f'n{size}']['p50_ms']}ms, "
+                  f"p99 {results[f'n{size}']['p99_ms']}ms")
+        return results
+
+    def bench_quantization(self) -> Dict:
+        """
+        int8/binary numpy index vs float32 on the largest corpus: recall@k of
+        project searches against the float results, latency and footprint.
+        """
+        from src.document_loader import RAGmailDocumentLoader
+        from src.numpy_store import NumpyVectorIndex, QUANTIZATIONS
+
+        size = self.args.sizes[-1]
+        store = self.stores[size]
+        documents = RAGmailDocumentLoader(str(self.workspace(size) / "data")).load_all_documents()
+        with quiet():
+            embeddings = store.embeddings.encode([doc.page_content for doc in documents])
+        ids = [doc.metadata["doc_id"] for doc in documents]
+        queries = [store.embed_query(query) for query in self.queries]
+        depths = sorted({self.args.k, 10})
+
+        results, truth = {}, {}
+        for method in QUANTIZATIONS:
+            index = NumpyVectorIndex(str(self.workspace(size) / f"quantized_{method}"), quantization=method,
+                                     rescore_factor=10 if method == "binary" else 4)
+            with quiet():
+                index.upsert(ids, embeddings, documents)
+
+            samples, found = [], {depth: [] for depth in depths}
+            for _ in range(self.args.search_rounds):
+                for i, query in enumerate(queries):
+                    start = time.perf_counter()
+                    hits = index.similarity_search_by_vector(query, k=max(depths), filter={"source": "projects"})
+                    samples.append(time.perf_counter() - start)
+                    hits = [doc.metadata["doc_id"] for doc in hits]
+                    if method == "none":
+                        truth[i] = hits
+                    for depth in depths:
+                        expected = set(truth[i][:depth])
+                        found[depth].append(len(expected & set(hits[:depth])) / max(len(expected), 1))
+
+            result = summarize(samples)
+            for depth in depths:
+                result[f"recall_at_{depth}"] = round(float(np.mean(found[depth])), 4)
+            result.update(index.footprint())
+            results[method] = result
+            print(f"  {method}: recall@{self.args.k} {result[f'recall_at_{self.args.k}']}, "
+                  f"p50 {result['p50_ms']}ms, {result['search_memory_bytes'] / 1e6:.2f}MB scanned, "
+                  f"{result['disk_bytes'] / 1e6:.2f}MB on disk")
+        return results
+
+    def configure_pipeline(self):
+        """Environment for the generator/API benchmarks: fake LLM, no response cache."""
+        os.environ["RAGMAIL_LLM_PROVIDER"] = "fake"
+        os.environ["RAGMAIL_FAKE_LATENCY_MS"] = str(self.args.llm_latency_ms)
+        os.environ["RAGMAIL_FAKE_TOKENS_PER_SEC"] = str(self.args.llm_tokens_per_sec)
+        os.environ["RAGMAIL_LLM_RPM"] = str(self.args.llm_rpm)
+        os.environ["RAGMAIL_LLM_TPM"] = str(self.args.llm_tpm)
+        os.environ["RAGMAIL_VECTOR_BACKEND"] = self.args.backend
+        os.environ["RAGMAIL_LLM_CACHE"] = "false"
+        os.environ["RAGMAIL_EMAIL_STORE"] = "false"
+        os.environ["RAGMAIL_WARMUP"] = "false"
+        # EmailGenerator reads data/ and chroma_db/ relative to the working directory
+        os.chdir(self.workspace(self.args.sizes[-1]))
+
+    def prepare_generator(self, generator):
+        engine = self.engine()
+        if engine is not None:
+            use_embeddings(generator.matcher.vector_store, engine)
+        with quiet():
+            generator.warm_up()
+
+    def request(self, i: int) -> Dict:
+        """Alternate between the generic and paper-based templates."""
+        payload = {
+            "professor_name": f"Dr. Bench {i}",
+            "university_name": "Benchmark University",
+            "research_domain": self.queries[i % len(self.queries)]
+        }
+        if i % 2:
+            payload["paper_title"] = f"On {self.queries[(i + 1) % len(self.queries)]}"
+            payload["paper_summary"] = "A study of scalable methods."
+        return payload
+
+    def bench_generate_email(self) -> Dict:
+        """Full generate_email latency on the largest corpus."""
+        from src.email_generator import EmailGenerator
+
+        generator = EmailGenerator()
+        self.prepare_generator(generator)
+
+        samples, prompt_tokens = [], []
+        with quiet():
+            for i in range(self.args.emails):
+                start = time.perf_counter()
+                result = generator.generate_email(**self.request(i))
+                samples.append(time.perf_counter() - start)
+                prompt_tokens.append(result["metadata"].get("tokens", {}).get("prompt", 0))
+
+        results = summarize(samples)
+        results["prompt_tokens_mean"] = round(float(np.mean(prompt_tokens)), 1)
+        results["corpus_projects"] = self.args.sizes[-1]
+        print(f"  generate_email: p50 {results['p50_ms']}ms, p99 {results['p99_ms']}ms, "
+              f"{results['prompt_tokens_mean']} prompt tokens/email")
+        return results
+
+    def bench_api(self) -> Dict:
+        """POST /api/generate-email throughput at each concurrency level."""
+        return asyncio.run(self._bench_api())
+
+    async def _bench_api(self) -> Dict:
+        import httpx
+
+        spec = importlib.util.spec_from_file_location("ragmail_api", ROOT / "backend" / "main.py")
+        api = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(api)
+
+        results = {}
+        with quiet():
+            async with api.lifespan(api.app):
+                await asyncio.to_thread(self.prepare_generator, api.email_generator)
+                transport = httpx.ASGITransport(app=api.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                    for concurrency in self.args.concurrency:
+                        results[f"c{concurrency}"] = await self._drive(client, concurrency)
+
+        for name, result in results.items():
+            print(f"  api {name}: {result['requests_per_sec']} req/s, "
+                  f"p50 {result['p50_ms']}ms, {result['errors']} errors")
+        return results
+
+    async def _drive(self, client, concurrency: int) -> Dict:
+        semaphore = asyncio.Semaphore(concurrency)
+        samples, errors = [], 0
+
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/generate-email", json=self.request(i))
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(self.args.requests)))
+        wall = time.perf_counter() - start
+
+        result = summarize(samples)
+        result["concurrency"] = concurrency
+        result["errors"] = errors
+        result["requests_per_sec"] = round(len(samples) / wall, 2) if wall else 0.0
+        return result
+
+
+BENCHMARKS = {
+    "index": "bench_index_build",
+    "embedding": "bench_query_embedding",
+    "search": "bench_search",
+    "quantization": "bench_quantization",
+    "generate": "bench_generate_email",
+    "api": "bench_api",
+}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Dotted-key view of every numeric metric."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(metric: str) -> Optional[bool]:
+    """Direction of a metric, or None for counts that aren't compared."""
+    if metric.endswith("per_sec") or ".recall_at_" in metric:
+        return True
+    if metric.endswith("_ms") or metric.endswith("seconds"):
+        return False
+    return None
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print the change of every comparable metric; return the regressed ones."""
+    current, previous = flatten(results), flatten(baseline)
+    regressions = []
+    print(f"\nComparison with baseline (regression threshold {threshold:.0f}%):")
+    for metric in sorted(current):
+        direction = higher_is_better(metric)
+        old = previous.get(metric)
+        if direction is None or not old:
+            continue
+        change = (current[metric] - old) / old * 100
+        worse = -change if direction else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(metric)
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"  {metric:45s} {old:>12.3f} -> {current[metric]:>12.3f}  ({change:+.1f}%){flag}")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RAGmail benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 200, 1000], help="Synthetic corpus sizes (projects)")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=os.getenv("RAGMAIL_VECTOR_BACKEND", "chroma"))
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model",
+                        help="'hash' uses offline feature-hashing embeddings instead of the sentence-transformers model")
+    parser.add_argument("--queries", type=int, default=50, help="Distinct research-area queries")
+    parser.add_argument("--search-rounds", type=int, default=5, help="Passes over the queries per corpus size")
+    parser.add_argument("--k", type=int, default=3, help="Projects retrieved per search")
+    parser.add_argument("--emails", type=int, default=20, help="generate_email calls")
+    parser.add_argument("--requests", type=int, default=64, help="API requests per concurrency level")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Fake LLM time to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=0, help="Fake LLM output speed (0 = instant)")
+    parser.add_argument("--llm-rpm", type=float, default=0, help="Scheduler requests/minute limit (0 = unlimited)")
+    parser.add_argument("--llm-tpm", type=float, default=0, help="Scheduler tokens/minute limit (0 = unlimited)")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any metric regressed")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    args.sizes = sorted(set(args.sizes))
+    selected = args.only or list(BENCHMARKS)
+    # Every other benchmark runs against the indexes built by the index benchmark
+    if "index" not in selected:
+        selected = ["index"] + selected
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output = output.resolve()
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+    cwd = os.getcwd()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="ragmail_bench_") as tmp:
+        runner = BenchmarkRunner(args, Path(tmp))
+        try:
+            for name in BENCHMARKS:
+                if name in selected:
+                    if name in ("generate", "api"):
+                        runner.configure_pipeline()
+                    print(f"Running {name} benchmark...")
+                    results[name] = getattr(runner, BENCHMARKS[name])()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+        },
+        "results": results
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions and args.fail_on_regression:
+            print(f"\n{len(regressions)} metric(s) regressed")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
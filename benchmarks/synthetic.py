@@ -0,0 +1,146 @@
+"""
+Synthetic data and offline embeddings for the RAGmail benchmarks.
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+from pathlib import Path
+from typing import List, Dict
+import numpy as np
+
+DOMAINS = [
+    "multi-agent systems", "natural language processing", "computer vision",
+    "reinforcement learning", "information retrieval", "graph neural networks",
+    "speech recognition", "robotics", "medical imaging", "recommender systems",
+    "time series forecasting", "federated learning", "explainable AI",
+    "program synthesis", "human-computer interaction", "edge computing"
+]
+
+TECHNOLOGIES = [
+    "Python", "PyTorch", "TensorFlow", "LangChain", "LangGraph", "FastAPI",
+    "React", "Next.js", "ChromaDB", "Docker", "Kubernetes", "OpenCV",
+    "scikit-learn", "HuggingFace Transformers", "PostgreSQL", "Redis"
+]
+
+KEYWORDS = [
+    "RLHF", "retrieval-augmented generation", "contrastive learning", "transformers",
+    "knowledge graphs", "diffusion models", "policy gradients", "semantic search",
+    "object detection", "few-shot learning", "agent orchestration", "anomaly detection",
+    "self-supervised learning", "question answering", "segmentation", "quantization"
+]
+
+NOUNS = ["Flow", "Lens", "Mind", "Forge", "Pilot", "Graph", "Sense", "Scope", "Net", "Bridge"]
+PREFIXES = ["Hire", "Med", "Trade", "Vision", "Agent", "Query", "Learn", "Code", "Bio", "Geo"]
+
+TEXT_FILES = ["achievements.txt", "research_interests.txt", "skills.txt", "coursework.txt"]
+
+
+def make_project(index: int, rng: random.Random) -> Dict:
+    """One project in the projects.json schema."""
+    domains = rng.sample(DOMAINS, 2)
+    technologies = rng.sample(TECHNOLOGIES, 4)
+    keywords = rng.sample(KEYWORDS, 3)
+    title = f"{rng.choice(PREFIXES)}{rng.choice(NOUNS)} {index}"
+    sentence = (
+        f"{title} applies {keywords[0]} and {keywords[1]} to problems in {domains[0]}, "
+        f"built with {technologies[0]} and {technologies[1]}. "
+    )
+    return {
+        "id": f"project-{index}",
+        "title": title,
+        "type": rng.choice(["Research", "Industry", "Hackathon"]),
+        "domain": domains,
+        "technologies": technologies,
+        "description": sentence,
+        "detailed_description": sentence * 6,
+        "impact": f"Improved {keywords[2]} results in {domains[1]} by {rng.randint(5, 40)}%.",
+        "key_features": [f"{keyword.capitalize()} pipeline" for keyword in keywords],
+        "research_keywords": keywords
+    }
+
+
+def write_dataset(data_dir: str, n_projects: int, seed: int = 0):
+    """Write projects.json with n synthetic projects plus the free-text sources."""
+    rng = random.Random(seed)
+    path = Path(data_dir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    with open(path / "projects.json", 'w', encoding='utf-8') as f:
+        json.dump([make_project(i, rng) for i in range(n_projects)], f, indent=2)
+
+    for filename in TEXT_FILES:
+        sections = []
+        for s in range(4):
+            paragraphs = [
+                f"Worked on {rng.choice(KEYWORDS)} for {rng.choice(DOMAINS)} using {rng.choice(TECHNOLOGIES)}. " * 3
+                for _ in range(3)
+            ]
+            sections.append(f"SECTION {s + 1}:\n\n" + "\n\n".join(paragraphs))
+        with open(path / filename, 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(sections))
+
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    """Research-area queries in the style of the API's research_domain field."""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(DOMAINS)} with {rng.choice(KEYWORDS)} and {rng.choice(KEYWORDS)}"
+        for _ in range(n)
+    ]
+
+
+class HashingEmbeddingEngine:
+    """
+    Deterministic feature-hashing embeddings (unigrams + bigrams).
+
+    Stands in for EmbeddingEngine when the sentence-transformers model can't be
+    downloaded, so the pipeline around the model can still be measured.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.signature = f"hashing-{dimensions}|normalized=True"
+        self.loaded = True
+        self.last_stats: Dict[str, float] = {}
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            digest = int(hashlib.md5(feature.encode("utf-8")).hexdigest(), 16)
+            vector[digest % self.dimensions] += 1.0 if digest & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        matrix = np.stack([self._vector(t) for t in texts]) if texts else \
+            np.zeros((0, self.dimensions), dtype=np.float32)
+        seconds = time.perf_counter() - start
+        self.last_stats = {
+            "documents": len(texts),
+            "seconds": seconds,
+            "docs_per_sec": len(texts) / seconds if seconds > 0 else 0.0,
+            "processes": 1
+        }
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text).tolist()
+
+    def close(self):
+        pass
+
+
+def use_embeddings(vector_store, engine):
+    """Swap a vector store's embedding engine (and cache namespace) for another one."""
+    vector_store.embeddings = engine
+    vector_store.embedding_model = engine.signature
+    if vector_store.embedding_cache is not None:
+        vector_store.embedding_cache.model_name = engine.signature
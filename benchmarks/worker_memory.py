@@ -0,0 +1,187 @@
+"""
+Per-worker memory of a multi-worker RAGmail API (Linux only).
+
+Reproduces what gunicorn.conf.py does: import the API and preload the
+libraries and embedding model in a parent process, fork N workers, and have
+each build its EmailGenerator, warm up and generate a few emails against the
+fake LLM provider. While all
+workers are alive, each reports RSS, PSS (shared pages split between the
+processes that map them) and USS (pages only that worker holds) from
+/proc/self/smaps_rollup. USS is the extra memory each additional worker costs.
+
+Usage (from the repository root):
+    python -m benchmarks.worker_memory --workers 4
+    python -m benchmarks.worker_memory --workers 4 --no-preload --backend chroma
+"""
+
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+import importlib.util
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import write_dataset, make_queries, HashingEmbeddingEngine, use_embeddings
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+
+def memory_kb() -> Dict[str, int]:
+    """RSS, PSS and USS of this process in kB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def build_index(workspace: Path, args: argparse.Namespace):
+    """Synthetic data and a read-only-servable index in workspace/."""
+    from src.document_loader import RAGmailDocumentLoader
+    from src.indexer import IncrementalIndexer
+    from src.vector_store import RAGmailVectorStore
+
+    write_dataset(str(workspace / "data"), args.projects)
+    store = RAGmailVectorStore(persist_directory=str(workspace / "chroma_db"), backend=args.backend)
+    if args.embeddings == "hash":
+        use_embeddings(store, HashingEmbeddingEngine())
+    with redirect_stdout(io.StringIO()):
+        IncrementalIndexer(RAGmailDocumentLoader(str(workspace / "data")), store).sync(full=True)
+
+
+def worker(args: argparse.Namespace, report_fd: int, release_fd: int):
+    """Body of one forked worker: serve a few requests, report memory, wait to be released."""
+    from src.email_generator import EmailGenerator
+
+    with redirect_stdout(io.StringIO()):
+        generator = EmailGenerator()
+        if args.embeddings == "hash":
+            use_embeddings(generator.matcher.vector_store, HashingEmbeddingEngine())
+        generator.warm_up()
+        for i, query in enumerate(make_queries(args.requests)):
+            generator.generate_email(f"Dr. Worker {i}", "Benchmark University", query)
+
+    os.write(report_fd, (json.dumps(memory_kb()) + "\n").encode("utf-8"))
+    os.close(report_fd)
+    # Stay alive until every worker has measured, so shared pages are counted once across all
+    os.read(release_fd, 1)
+    os._exit(0)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of a multi-worker RAGmail API")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--projects", type=int, default=200, help="Synthetic corpus size")
+    parser.add_argument("--requests", type=int, default=5, help="Emails generated by each worker before measuring")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="numpy")
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model",
+                        help="'hash' runs offline without the sentence-transformers model")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Import and load everything in each worker instead of before fork")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/worker_memory_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork") or not Path("/proc/self/smaps_rollup").exists():
+        print("worker_memory needs Linux (fork and /proc/self/smaps_rollup)")
+        return 1
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"worker_memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output = output.resolve()
+    cwd = os.getcwd()
+
+    os.environ.update({
+        "RAGMAIL_LLM_PROVIDER": "fake",
+        "RAGMAIL_LLM_RPM": "0",
+        "RAGMAIL_LLM_TPM": "0",
+        "RAGMAIL_LLM_CACHE": "false",
+        "RAGMAIL_EMAIL_STORE": "false",
+        "RAGMAIL_VECTOR_BACKEND": args.backend,
+        "TOKENIZERS_PARALLELISM": "false",
+    })
+
+    with tempfile.TemporaryDirectory(prefix="ragmail_workers_") as tmp:
+        workspace = Path(tmp)
+        # Index built in a child so the parent stays as lean as a gunicorn master
+        pid = os.fork()
+        if pid == 0:
+            build_index(workspace, args)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        os.chdir(workspace)
+
+        preload = not args.no_preload
+        if preload:
+            # What gunicorn's master does with preload_app: import the app, then preload
+            spec = importlib.util.spec_from_file_location("ragmail_api", ROOT / "backend" / "main.py")
+            api = importlib.util.module_from_spec(spec)
+            with redirect_stdout(io.StringIO()):
+                spec.loader.exec_module(api)
+                api.preload(load_model=args.embeddings == "model")
+        parent = memory_kb()
+
+        report_r, report_w = os.pipe()
+        release_r, release_w = os.pipe()
+        pids = []
+        for _ in range(args.workers):
+            pid = os.fork()
+            if pid == 0:
+                os.close(report_r)
+                os.close(release_w)
+                worker(args, report_w, release_r)
+            pids.append(pid)
+        os.close(report_w)
+        os.close(release_r)
+
+        with os.fdopen(report_r, 'r', encoding='utf-8') as reports:
+            workers = [json.loads(line) for line in reports]
+        os.close(release_w)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        os.chdir(cwd)
+
+    total_pss = parent["pss_kb"] + sum(w["pss_kb"] for w in workers)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "workers": args.workers,
+            "projects": args.projects,
+            "backend": args.backend,
+            "embeddings": args.embeddings,
+            "preload": preload
+        },
+        "parent": parent,
+        "workers": workers,
+        "total_pss_kb": total_pss,
+        "mean_worker_uss_kb": round(sum(w["uss_kb"] for w in workers) / max(1, len(workers)))
+    }
+
+    print(f"Parent (preload={preload}): RSS {parent['rss_kb'] / 1024:.1f} MB")
+    for i, w in enumerate(workers):
+        print(f"Worker {i}: RSS {w['rss_kb'] / 1024:.1f} MB, PSS {w['pss_kb'] / 1024:.1f} MB, "
+              f"USS {w['uss_kb'] / 1024:.1f} MB")
+    print(f"Total PSS across {len(workers)} workers + parent: {total_pss / 1024:.1f} MB")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
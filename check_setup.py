@@ -46,4 +46,6 @@ for file in data_files:
     else:
         print(f"✗ {file} MISSING")
 
+print("\nStartup check: run python -m pytest tests/test_startup.py")
+
 print("\nSetup verification complete!")
@@ -9,7 +9,8 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
     research_domain: '',
     paper_title: '',
     paper_summary: '',
-    force_project: ''
+    force_project: '',
+    regenerate: false
   });
 
   const [error, setError] = useState('');
@@ -17,7 +18,7 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
   const handleChange = (e) => {
     setFormData({
       ...formData,
-      [e.target.name]: e.target.value
+      [e.target.name]: e.target.type === 'checkbox' ? e.target.checked : e.target.value
     });
   };
 
@@ -27,7 +28,7 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
     setLoading(true);
 
     try {
-      const response = await fetch('http://localhost:8000/api/generate-email', {
+      const response = await fetch('http://localhost:8000/api/generate-email/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -40,8 +41,38 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
         throw new Error(errorData.detail || 'Failed to generate email');
       }
 
-      const data = await response.json();
-      onEmailGenerated(data);
+      // Read server-sent events: selection -> paragraph tokens -> final email
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let draft = null;
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+
+          if (event === 'selection') {
+            draft = { email: '', selected_project: data.selected_project, relevance_score: data.relevance_score };
+            setLoading(false);
+            onEmailGenerated(draft);
+          } else if (event === 'token') {
+            draft = { ...draft, email: draft.email + data.text };
+            onEmailGenerated(draft);
+          } else if (event === 'email') {
+            onEmailGenerated(data);
+          } else if (event === 'error') {
+            throw new Error(data.detail);
+          }
+        }
+      }
     } catch (err) {
       setError(err.message);
       console.error('Error generating email:', err);
@@ -57,7 +88,8 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
       research_domain: '',
       paper_title: '',
       paper_summary: '',
-      force_project: ''
+      force_project: '',
+      regenerate: false
     });
     setError('');
   };
@@ -165,6 +197,20 @@ export default function EmailForm({ onEmailGenerated, loading, setLoading }) {
           </p>
         </div>
 
+        {/* Regenerate */}
+        <div>
+          <label className="flex items-center gap-2 text-sm font-medium text-gray-700 dark:text-gray-300">
+            <input
+              type="checkbox"
+              name="regenerate"
+              checked={formData.regenerate}
+              onChange={handleChange}
+              className="h-4 w-4 rounded border-gray-300 dark:border-gray-600"
+            />
+            Generate a new email even if one was already generated for this professor
+          </label>
+        </div>
+
         {/* Error Message */}
         {error && (
           <div className="bg-red-50 dark:bg-red-900/20 border border-red-200 dark:border-red-800 text-red-700 dark:text-red-400 px-4 py-3 rounded-lg">
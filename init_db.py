@@ -4,14 +4,16 @@ Initialize the RAGmail vector database
 
 import sys
 import os
+import argparse
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from src.document_loader import RAGmailDocumentLoader
 from src.vector_store import RAGmailVectorStore
+from src.indexer import IncrementalIndexer
 
-def main():
+def main(full: bool = False):
     print("=" * 80)
     print("RAGmail Vector Database Initialization")
     print("=" * 80)
@@ -24,15 +26,25 @@ def main():
     print(f"✓ Loaded {len(documents)} documents")
     print()
     
-    # Create vector store
-    print("Step 2: Creating vector database...")
+    # Create or update vector store
+    if full:
+        print("Step 2: Rebuilding vector database from scratch...")
+    else:
+        print("Step 2: Updating vector database (only new or changed documents are embedded)...")
     print("  - Downloading embedding model (first time only)...")
-    print("  - Generating embeddings for all documents...")
-    print("  - This may take 2-3 minutes...")
+    print("  - Generating embeddings...")
     print()
     
     vector_store = RAGmailVectorStore()
-    vector_store.create_vectorstore(documents)
+    IncrementalIndexer(loader, vector_store).sync(full=full)
+    
+    footprint = vector_store.footprint()
+    print(f"Index size on disk: {footprint['disk_bytes'] / 1e6:.1f} MB")
+    if "search_memory_bytes" in footprint:
+        print(
+            f"Scanned per search: {footprint['search_memory_bytes'] / 1e6:.1f} MB "
+            f"({vector_store.quantization}; float32 vectors: {footprint['float32_bytes'] / 1e6:.1f} MB)"
+        )
     
     print()
     print("=" * 80)
@@ -51,4 +63,7 @@ def main():
     print()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Initialize or update the RAGmail vector database")
+    parser.add_argument("--full", action="store_true", help="Drop the index and re-embed every document")
+    args = parser.parse_args()
+    main(full=args.full)
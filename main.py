@@ -5,9 +5,13 @@ Main application interface
 
 import os
 import sys
+import asyncio
+import argparse
 from pathlib import Path
 from datetime import datetime
 from src.email_generator import EmailGenerator
+from src.email_store import email_store_from_env
+from src.batch import load_professor_rows, generate_batch, default_output_path, DEFAULT_CONCURRENCY
 
 
 def print_header():
@@ -28,12 +32,14 @@ def get_input(prompt: str, required: bool = True) -> str:
 
 
 def save_email(email_data: dict, professor_name: str):
-    """Save generated email to file."""
+    """Save generated email to a text file (one file per stored email, however often it is saved)."""
     output_dir = Path("generated_emails")
     output_dir.mkdir(exist_ok=True)
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{professor_name.replace(' ', '_').replace('.', '')}_{timestamp}.txt"
+    # Every email is already in the email store; name the file after its record
+    email_id = email_data['metadata'].get('email_id')
+    suffix = f"email{email_id}" if email_id is not None else datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{professor_name.replace(' ', '_').replace('.', '')}_{suffix}.txt"
     filepath = output_dir / filename
     
     with open(filepath, 'w', encoding='utf-8') as f:
@@ -49,15 +55,14 @@ def save_email(email_data: dict, professor_name: str):
     print(f"\n✓ Email saved to: {filepath}")
 
 
-def main():
-    """Main application."""
-    print_header()
-    
-    # Initialize generator
+def init_generator() -> EmailGenerator:
+    """Initialize the email generator or exit with a helpful message."""
     print("Initializing RAGmail system...")
     try:
         generator = EmailGenerator()
+        generator.warm_up()
         print("✓ System ready!\n")
+        return generator
     except FileNotFoundError:
         print("\n❌ Error: Vector database not initialized.")
         print("Please run: python src/vector_store.py")
@@ -65,6 +70,73 @@ def main():
     except Exception as e:
         print(f"\n❌ Error initializing system: {e}")
         sys.exit(1)
+
+
+def run_batch(batch_file: str, output: str = None, concurrency: int = DEFAULT_CONCURRENCY, regenerate: bool = False):
+    """Generate emails for every professor in a CSV/JSONL file (stored emails are reused unless regenerate)."""
+    print_header()
+    
+    rows = load_professor_rows(batch_file)
+    if regenerate:
+        for row in rows:
+            row["regenerate"] = True
+    output_path = Path(output) if output else default_output_path()
+    print(f"Loaded {len(rows)} professors from {batch_file}")
+    
+    generator = init_generator()
+    
+    done = {"count": 0, "failed": 0}
+    
+    def report(record: dict):
+        done["count"] += 1
+        if record["success"]:
+            status = f"✓ {record['email']['metadata']['selected_project']}"
+            if record['email']['metadata'].get('stored'):
+                status += " (stored)"
+        else:
+            done["failed"] += 1
+            status = f"❌ {record['error']}"
+        print(f"[{done['count']}/{len(rows)}] {record['professor_name']}: {status}")
+    
+    print(f"🔄 Generating with concurrency {concurrency}...\n")
+    asyncio.run(generate_batch(
+        generator, rows, output_path=str(output_path), concurrency=concurrency, on_result=report
+    ))
+    
+    print(f"\n✓ {done['count'] - done['failed']} succeeded, {done['failed']} failed")
+    print(f"✓ Results saved to: {output_path}")
+
+
+def list_emails(professor: str = None):
+    """Print the stored emails, newest first."""
+    store = email_store_from_env()
+    if store is None:
+        print("The email store is disabled (RAGMAIL_EMAIL_STORE=false)")
+        return
+    emails = store.list(limit=1000, professor=professor)
+    for record in emails:
+        created = datetime.fromtimestamp(record['created_at']).strftime("%Y-%m-%d %H:%M")
+        print(f"#{record['id']:<5} {created}  {record['professor_name']} ({record['university_name']}) "
+              f"- {record['metadata'].get('selected_project')}")
+    print(f"\n{len(emails)} of {store.count()} stored emails")
+
+
+def export_emails(path: str):
+    """Export the stored emails to a .jsonl or .csv file."""
+    store = email_store_from_env()
+    if store is None:
+        print("The email store is disabled (RAGMAIL_EMAIL_STORE=false)")
+        return
+    count = store.export(path)
+    print(f"✓ Exported {count} emails to {path}")
+
+
+def main(regenerate: bool = False):
+    """Main application."""
+    print_header()
+    
+    # Initialize generator
+    generator = init_generator()
     
     while True:
         print("\n" + "-" * 80)
@@ -88,7 +160,7 @@ def main():
         # Generate email
         print("\n🔄 Generating personalized email...")
         try:
-            email = generator.generate_email(
+            request = dict(
                 professor_name=prof_name,
                 university_name=university,
                 research_domain=research_area,
@@ -96,6 +168,14 @@ def main():
                 paper_summary=paper_summary if paper_summary else None,
                 use_specific_project=force_project if force_project else None
             )
+            email = generator.generate_email(**request, regenerate=regenerate)
+            
+            if email['metadata'].get('stored'):
+                stored_at = datetime.fromtimestamp(email['metadata']['stored_at']).strftime("%Y-%m-%d %H:%M")
+                print(f"\nℹ️  An email for this professor was already generated on {stored_at}.")
+                if get_input("Generate a new one instead? (y/n): ").lower() == 'y':
+                    print("\n🔄 Regenerating...")
+                    email = generator.generate_email(**request, regenerate=True)
             
             # Display email
             print("\n" + "=" * 80)
@@ -126,4 +206,20 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="RAGmail professor outreach email generator")
+    parser.add_argument("--batch", metavar="FILE", help="Generate emails for every row of a .csv or .jsonl file")
+    parser.add_argument("--output", metavar="FILE", help="JSONL file for batch results (default: generated_emails/batch_<timestamp>.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Rows generated at the same time in batch mode")
+    parser.add_argument("--regenerate", action="store_true", help="Generate new emails even for professors already in the email store")
+    parser.add_argument("--list-emails", nargs="?", const="", metavar="NAME", help="List stored emails (optionally only professors matching NAME)")
+    parser.add_argument("--export", metavar="FILE", help="Export stored emails to a .jsonl or .csv file")
+    args = parser.parse_args()
+    
+    if args.list_emails is not None:
+        list_emails(args.list_emails or None)
+    elif args.export:
+        export_emails(args.export)
+    elif args.batch:
+        run_batch(args.batch, args.output, args.concurrency, args.regenerate)
+    else:
+        main(args.regenerate)
@@ -0,0 +1,139 @@
+"""
+Batch email generation for RAGmail.
+Runs EmailGenerator across many professors with bounded concurrency.
+"""
+
+import os
+import csv
+import json
+import asyncio
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional, Callable
+from src.llm_scheduler import llm_priority, BATCH
+
+# Row columns accepted in CSV/JSONL input (same names as the API request)
+PROFESSOR_FIELDS = (
+    "professor_name",
+    "university_name",
+    "research_domain",
+    "paper_title",
+    "paper_summary",
+    "force_project",
+    "regenerate",
+)
+REQUIRED_FIELDS = ("professor_name", "university_name", "research_domain")
+
+# Most rows an API batch request may generate at once
+MAX_BATCH_CONCURRENCY = max(1, int(os.getenv("RAGMAIL_BATCH_MAX_CONCURRENCY", "16")))
+DEFAULT_CONCURRENCY = int(os.getenv("RAGMAIL_BATCH_CONCURRENCY", "4"))
+
+
+def normalize_row(raw: Dict) -> Dict:
+    """Keep known columns and turn blank optional values into None."""
+    row = {}
+    for field in PROFESSOR_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        row[field] = value or None
+    # CSV cells arrive as text
+    regenerate = row["regenerate"]
+    row["regenerate"] = regenerate.lower() in ("1", "true", "yes") if isinstance(regenerate, str) else bool(regenerate)
+    return row
+
+
+def load_professor_rows(path: str) -> List[Dict]:
+    """Load professor rows from a .csv or .jsonl file."""
+    file_path = Path(path)
+
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        if file_path.suffix.lower() == ".csv":
+            raw_rows = list(csv.DictReader(f))
+        elif file_path.suffix.lower() in (".jsonl", ".ndjson"):
+            raw_rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            raise ValueError(f"Unsupported batch file type: {file_path.suffix} (use .csv or .jsonl)")
+
+    return [normalize_row(raw) for raw in raw_rows]
+
+
+def default_output_path(output_dir: str = "generated_emails") -> Path:
+    """Timestamped JSONL path for batch results."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return Path(output_dir) / f"batch_{timestamp}.jsonl"
+
+
+async def generate_row(generator, index: int, row: Dict) -> Dict:
+    """Generate one row, capturing any failure in the record instead of raising."""
+    record = {"row": index, "professor_name": row.get("professor_name")}
+    try:
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+        # Batch rows yield to interactive requests for LLM rate-limit budget
+        with llm_priority(BATCH):
+            record["email"] = await generator.agenerate_email(
+                professor_name=row["professor_name"],
+                university_name=row["university_name"],
+                research_domain=row["research_domain"],
+                paper_title=row.get("paper_title"),
+                paper_summary=row.get("paper_summary"),
+                use_specific_project=row.get("force_project"),
+                regenerate=bool(row.get("regenerate"))
+            )
+        record["success"] = True
+    except Exception as e:
+        record["success"] = False
+        record["error"] = str(e)
+    return record
+
+
+async def generate_batch(
+    generator,
+    rows: List[Dict],
+    output_path: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    on_result: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    Generate emails for many professors concurrently.
+
+    Args:
+        generator: EmailGenerator instance
+        rows: Professor rows (see PROFESSOR_FIELDS)
+        output_path: Optional JSONL file; each record is appended as soon as its row finishes
+        concurrency: Maximum number of rows generated at the same time
+        on_result: Optional callback invoked with each finished record
+
+    Returns:
+        Records in input order, each with 'row', 'success' and 'email' or 'error'
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int, row: Dict) -> Dict:
+        async with semaphore:
+            return await generate_row(generator, index, row)
+
+    out = None
+    if output_path:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        out = open(output_path, 'a', encoding='utf-8')
+
+    records = []
+    try:
+        for task in asyncio.as_completed([run(i, row) for i, row in enumerate(rows)]):
+            record = await task
+            records.append(record)
+            if out is not None:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            if on_result is not None:
+                on_result(record)
+    finally:
+        if out is not None:
+            out.close()
+
+    records.sort(key=lambda r: r["row"])
+    return records
@@ -0,0 +1,29 @@
+"""
+SQLite connections for RAGmail's on-disk caches and stores.
+"""
+
+import sqlite3
+from pathlib import Path
+
+# Seconds a connection waits for another process's write lock before failing
+BUSY_TIMEOUT = 30
+
+
+def open_shared_db(path: str, autocommit: bool = False) -> sqlite3.Connection:
+    """
+    Open (creating its directory) a SQLite file that several API worker
+    processes share: WAL so readers don't block the writer, and a busy
+    timeout so writers queue instead of failing. The connection may be used
+    from any thread; callers serialize access with their own lock.
+
+    autocommit=True leaves transactions to the caller (e.g. BEGIN IMMEDIATE).
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(
+        str(path),
+        check_same_thread=False,
+        timeout=BUSY_TIMEOUT,
+        **({"isolation_level": None} if autocommit else {})
+    )
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
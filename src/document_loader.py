@@ -3,24 +3,268 @@ Document loader for RAGmail system.
 Loads and chunks projects, achievements, skills, and other background data.
 """
 
+import os
 import json
+import math
+import time
+import hashlib
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
 from langchain_core.documents import Document
 
+# Free-text background sources: (filename, source type)
+TEXT_SOURCES = [
+    ("achievements.txt", "achievements"),
+    ("research_interests.txt", "research_interests"),
+    ("skills.txt", "skills"),
+    ("coursework.txt", "coursework"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate WordPiece token count (~4 tokens per 3 English words)."""
+    return math.ceil(len(text.split()) * 4 / 3)
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Cut text to roughly `budget` tokens at a word boundary, marking the cut with '...'."""
+    words = text.split()
+    limit = max(0, budget * 3 // 4)
+    if len(words) <= limit:
+        return " ".join(words)
+    return " ".join(words[:limit]).rstrip(",;:.") + "..."
+
+
+def fit_lines(lines: List[str], budget: int) -> str:
+    """Join lines in priority order until the token budget is spent; the last one may be truncated."""
+    kept, remaining = [], budget
+    for line in lines:
+        line = " ".join(line.split())
+        tokens = estimate_tokens(line)
+        if tokens <= remaining:
+            kept.append(line)
+            remaining -= tokens
+            continue
+        if remaining >= 8:
+            kept.append(truncate_tokens(line, remaining))
+        break
+    return "\n".join(kept)
+
+
+def selection_summary(project: Dict, budget: int) -> str:
+    """Compact description used to compare candidate projects in the selection prompt."""
+    return fit_lines([
+        f"Project: {project['title']}",
+        f"Domain: {', '.join(project['domain'])}",
+        f"Technologies: {', '.join(project['technologies'][:8])}",
+        f"Summary: {project['description']}",
+        f"Keywords: {', '.join(project['research_keywords'][:8])}",
+    ], budget)
+
+
+def paragraph_context(project: Dict, budget: int) -> str:
+    """Details the paragraph writer needs about the selected project (title is sent separately)."""
+    features = project['key_features'][:4]
+    return fit_lines([
+        f"Description: {project['description']}",
+        f"Technologies: {', '.join(project['technologies'])}",
+        f"Impact: {project['impact']}",
+        "Key Features: " + "; ".join(features),
+        f"Overview: {project['detailed_description']}",
+    ], budget)
+
+
+def _is_heading(line: str) -> bool:
+    """Markdown headings, short ALL-CAPS lines and short lines ending in ':'."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80 or stripped[0] in "-*•":
+        return False
+    return (
+        stripped.startswith("#")
+        or stripped.endswith(":")
+        or (stripped.isupper() and any(c.isalpha() for c in stripped))
+    )
+
+
+def split_sections(text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """Split text into (heading, paragraphs) sections."""
+    sections = []
+    heading, paragraphs, block = None, [], []
+    
+    def flush_block():
+        if block:
+            paragraphs.append("\n".join(block))
+            block.clear()
+    
+    for line in text.splitlines():
+        if _is_heading(line):
+            flush_block()
+            sections.append((heading, paragraphs))
+            heading, paragraphs = line.strip(), []
+        elif not line.strip():
+            flush_block()
+        else:
+            block.append(line.rstrip())
+    flush_block()
+    sections.append((heading, paragraphs))
+    
+    return [(h, p) for h, p in sections if p]
+
+
+def _split_units(block: str, budget: int, overlap: int = 0) -> List[str]:
+    """
+    Break a paragraph that exceeds the budget into lines, then word windows.
+    
+    Consecutive windows share about `overlap` tokens, since a full-budget
+    window leaves no room to carry a previous unit into the next chunk.
+    """
+    if estimate_tokens(block) <= budget:
+        return [block]
+    lines = [line for line in block.splitlines() if line.strip()]
+    if len(lines) > 1:
+        return [unit for line in lines for unit in _split_units(line, budget, overlap)]
+    words = block.split()
+    size = max(1, budget * 3 // 4)
+    shared = min(overlap * 3 // 4, size - 1)
+    last = max(1, len(words) - shared)
+    return [" ".join(words[i:i + size]) for i in range(0, last, size - shared)]
+
+
+def chunk_text(text: str, chunk_tokens: int, chunk_overlap: int) -> List[Tuple[Optional[str], str]]:
+    """
+    Section-aware chunking with a token budget and overlap.
+    
+    Chunks never cross a section boundary; each chunk repeats its section
+    heading so it embeds with that context. Consecutive chunks in a section
+    share up to chunk_overlap tokens of trailing paragraphs; a paragraph
+    longer than a chunk is cut into word windows that overlap by as much.
+    
+    Returns:
+        List of (section heading, chunk text)
+    """
+    chunks = []
+    for heading, paragraphs in split_sections(text):
+        budget = max(1, chunk_tokens - (estimate_tokens(heading) if heading else 0))
+        units = [unit for paragraph in paragraphs for unit in _split_units(paragraph, budget, chunk_overlap)]
+        
+        current, current_tokens = [], 0
+        for unit in units:
+            tokens = estimate_tokens(unit)
+            if current and current_tokens + tokens > budget:
+                chunks.append((heading, current))
+                # Carry trailing units into the next chunk as overlap
+                carry, carry_tokens = [], 0
+                for prev in reversed(current):
+                    prev_tokens = estimate_tokens(prev)
+                    if carry_tokens + prev_tokens > chunk_overlap:
+                        break
+                    carry.insert(0, prev)
+                    carry_tokens += prev_tokens
+                while carry and carry_tokens + tokens > budget:
+                    carry_tokens -= estimate_tokens(carry.pop(0))
+                current, current_tokens = carry, carry_tokens
+            current.append(unit)
+            current_tokens += tokens
+        if current:
+            chunks.append((heading, current))
+    
+    return [
+        (heading, "\n\n".join(([heading] if heading else []) + units))
+        for heading, units in chunks
+    ]
+
+
+class ProjectCatalog:
+    """
+    Parsed projects.json shared by everything in the process that reads it.
+    
+    The file is parsed once per change. Reads re-check its modification time
+    and size at most every `check_interval` seconds, and a change reloads it
+    and issues a new ETag (a hash of the file content).
+    """
+    
+    _shared: Dict[str, "ProjectCatalog"] = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, path, check_interval: Optional[float] = None):
+        self.path = Path(path)
+        self.check_interval = check_interval if check_interval is not None else \
+            float(os.getenv("RAGMAIL_CATALOG_CHECK_SECONDS", "1.0"))
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._projects: List[Dict] = []
+        self._etag = ""
+    
+    @classmethod
+    def shared(cls, path) -> "ProjectCatalog":
+        """The process-wide catalog for a projects.json path."""
+        key = os.path.realpath(path)
+        with cls._shared_lock:
+            catalog = cls._shared.get(key)
+            if catalog is None:
+                catalog = cls._shared[key] = cls(key)
+            return catalog
+    
+    def _refresh(self):
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked < self.check_interval:
+            return
+        stat = self.path.stat()  # FileNotFoundError if the catalog is gone
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        self._checked = now
+        if stamp == self._stamp:
+            return
+        
+        raw = self.path.read_bytes()
+        self._projects = json.loads(raw.decode('utf-8'))
+        self._etag = hashlib.sha256(raw).hexdigest()[:32]
+        self._stamp = stamp
+    
+    def snapshot(self) -> Tuple[List[Dict], str]:
+        """Current (projects, etag). Treat the project dicts as read-only."""
+        with self._lock:
+            self._refresh()
+            return self._projects, self._etag
+    
+    def projects(self) -> List[Dict]:
+        return self.snapshot()[0]
+    
+    @property
+    def etag(self) -> str:
+        """Changes whenever the file content changes."""
+        return self.snapshot()[1]
+
 
 class RAGmailDocumentLoader:
     """Load and prepare documents for RAG system."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        chunk_tokens: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        summary_tokens: Optional[int] = None,
+        context_tokens: Optional[int] = None
+    ):
         self.data_dir = Path(data_dir)
+        # all-MiniLM-L6-v2 truncates inputs at 256 tokens; stay safely below it
+        self.chunk_tokens = chunk_tokens or int(os.getenv("RAGMAIL_CHUNK_TOKENS", "200"))
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else \
+            int(os.getenv("RAGMAIL_CHUNK_OVERLAP", "40"))
+        # Prompt fragments precomputed per project so the chain never sends full documents
+        self.summary_tokens = summary_tokens or int(os.getenv("RAGMAIL_SELECTION_SUMMARY_TOKENS", "90"))
+        self.context_tokens = context_tokens or int(os.getenv("RAGMAIL_PARAGRAPH_CONTEXT_TOKENS", "220"))
+        self.catalog = ProjectCatalog.shared(self.data_dir / "projects.json")
+        self._project_documents: Tuple[str, List[Document]] = ("", [])
     
     def load_projects(self) -> List[Document]:
-        """Load projects from JSON and create documents."""
-        projects_path = self.data_dir / "projects.json"
-        
-        with open(projects_path, 'r', encoding='utf-8') as f:
-            projects = json.load(f)
+        """Project documents, rebuilt only when projects.json changes."""
+        projects, etag = self.catalog.snapshot()
+        cached_etag, cached = self._project_documents
+        if cached_etag == etag:
+            return list(cached)
         
         documents = []
         for project in projects:
@@ -46,11 +290,15 @@ Research Keywords: {', '.join(project['research_keywords'])}
             # ChromaDB metadata must be strings, numbers, or booleans (no lists)
             metadata = {
                 "source": "projects",
+                "doc_id": f"projects:{project['id']}",  # Stable ID for incremental indexing
+                "parent_id": f"projects:{project['id']}",
                 "project_id": project['id'],
                 "title": project['title'],
                 "type": project['type'],
                 "domains": ', '.join(project['domain']),  # Convert list to string
-                "keywords": ', '.join(project['research_keywords'])  # Convert list to string
+                "keywords": ', '.join(project['research_keywords']),  # Convert list to string
+                "selection_summary": selection_summary(project, self.summary_tokens),
+                "paragraph_context": paragraph_context(project, self.context_tokens)
             }
             
             if 'github' in project:
@@ -60,19 +308,43 @@ Research Keywords: {', '.join(project['research_keywords'])}
             
             documents.append(Document(page_content=content, metadata=metadata))
         
-        return documents
+        self._project_documents = (etag, documents)
+        return list(documents)
     
-    def load_text_file(self, filename: str, source_type: str) -> List[Document]:
-        """Load a text file and create a document."""
+    def load_text_file(self, filename: str, source_type: str, chunk: bool = True) -> List[Document]:
+        """Load a text file as section-aware chunks (or one document if chunk=False)."""
         file_path = self.data_dir / filename
         
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        return [Document(
-            page_content=content,
-            metadata={"source": source_type, "filename": filename}
-        )]
+        parent_id = f"{source_type}:{filename}"
+        if not chunk:
+            return [Document(
+                page_content=content,
+                metadata={
+                    "source": source_type,
+                    "doc_id": parent_id,
+                    "filename": filename
+                }
+            )]
+        
+        chunks = chunk_text(content, self.chunk_tokens, self.chunk_overlap)
+        return [
+            Document(
+                page_content=text,
+                metadata={
+                    "source": source_type,
+                    "doc_id": f"{parent_id}#{i}",
+                    "parent_id": parent_id,
+                    "filename": filename,
+                    "section": heading or "",
+                    "chunk_index": i,
+                    "chunk_count": len(chunks)
+                }
+            )
+            for i, (heading, text) in enumerate(chunks)
+        ]
     
     def load_all_documents(self) -> List[Document]:
         """Load all documents for the RAG system."""
@@ -81,14 +353,19 @@ Research Keywords: {', '.join(project['research_keywords'])}
         # Load projects (most important for matching)
         documents.extend(self.load_projects())
         
-        # Load other background data
-        documents.extend(self.load_text_file("achievements.txt", "achievements"))
-        documents.extend(self.load_text_file("research_interests.txt", "research_interests"))
-        documents.extend(self.load_text_file("skills.txt", "skills"))
-        documents.extend(self.load_text_file("coursework.txt", "coursework"))
+        # Load other background data as chunks
+        for filename, source_type in TEXT_SOURCES:
+            documents.extend(self.load_text_file(filename, source_type))
         
         return documents
     
+    def load_parent_documents(self) -> List[Document]:
+        """Unchunked text sources, used to map retrieved chunks back to their parent."""
+        documents = []
+        for filename, source_type in TEXT_SOURCES:
+            documents.extend(self.load_text_file(filename, source_type, chunk=False))
+        return documents
+    
     def load_email_templates(self) -> str:
         """Load email templates separately (not for vector DB)."""
         templates_path = self.data_dir / "email_templates.txt"
@@ -4,10 +4,14 @@ Selects appropriate template and generates personalized emails.
 """
 
 import os
-from typing import Optional, Dict
+import asyncio
+import threading
+from typing import Optional, Dict, AsyncIterator, Tuple
 from dotenv import load_dotenv
 from src.document_loader import RAGmailDocumentLoader
-from src.rag_chain import ProfessorProjectMatcher
+from src.project_index import ProjectIndex
+from src.email_store import EmailStore, email_key, email_store_from_env
+from src import metrics
 
 load_dotenv()
 
@@ -31,9 +35,56 @@ class EmailGenerator:
 Best regards,
 Zain Azhar"""
     
-    def __init__(self):
-        self.matcher = ProfessorProjectMatcher()
+    def __init__(self, fuzzy_project_match: Optional[bool] = None, email_store: Optional[EmailStore] = None):
         self.loader = RAGmailDocumentLoader()
+        # Emails already generated for a professor are returned instead of regenerated
+        self.email_store = email_store if email_store is not None else email_store_from_env()
+        # Forced projects are looked up directly; fuzzy matching tolerates typos in titles
+        if fuzzy_project_match is None:
+            fuzzy_project_match = os.getenv("RAGMAIL_FUZZY_PROJECT_MATCH", "false").lower() in ("1", "true", "yes")
+        self.fuzzy_project_match = fuzzy_project_match
+        self._project_index: Optional[ProjectIndex] = None
+        self._project_index_etag: Optional[str] = None
+        # Candidates shown to the selection LLM; hybrid retrieval makes a small k reliable
+        self.candidate_count = int(os.getenv("RAGMAIL_CANDIDATES", "3"))
+        # The matcher pulls in LangChain/Groq, the vector store and the embedding
+        # model, so it is created on first use (or by warm_up()).
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+    
+    @property
+    def matcher(self):
+        """The project matcher, created on first use."""
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    from src.rag_chain import ProfessorProjectMatcher
+                    self._matcher = ProfessorProjectMatcher()
+        return self._matcher
+    
+    @property
+    def project_index(self) -> ProjectIndex:
+        """Projects by ID and title from the project catalog (or the index metadata without one)."""
+        try:
+            etag = self.loader.catalog.etag
+        except FileNotFoundError:
+            if self._project_index is None:
+                self._project_index = ProjectIndex.from_vector_store(self.matcher.vector_store)
+            return self._project_index
+        if self._project_index is None or etag != self._project_index_etag:
+            # Rebuilt only when projects.json changes
+            self._project_index = ProjectIndex.from_loader(self.loader)
+            self._project_index_etag = etag
+        return self._project_index
+    
+    @property
+    def ready(self) -> bool:
+        """Whether warm_up() (or a first request) has already loaded everything."""
+        return self._matcher is not None and self._matcher.vector_store.embeddings.loaded
+    
+    def warm_up(self):
+        """Create the matcher, open the index and load the embedding model now."""
+        self.matcher.warm_up()
     
     def _select_template_type(
         self, 
@@ -60,7 +111,8 @@ Zain Azhar"""
         research_domain: str,
         paper_title: Optional[str] = None,
         paper_summary: Optional[str] = None,
-        use_specific_project: Optional[str] = None
+        use_specific_project: Optional[str] = None,
+        regenerate: bool = False
     ) -> Dict[str, str]:
         """
         Generate a personalized email.
@@ -71,71 +123,327 @@ Zain Azhar"""
             research_domain: Professor's research area
             paper_title: Optional recent paper title
             paper_summary: Optional paper summary/purpose
-            use_specific_project: Optional project ID to force use of specific project
+            use_specific_project: Optional project ID or title to force use of specific project
+                (looked up directly; raises ValueError if no such project exists)
+            regenerate: Generate a new email even if one is stored for this request
         
         Returns:
-            Dict with 'subject', 'body', and 'metadata'
+            Dict with 'subject', 'body', and 'metadata' ('stored' is True when
+            the email came from the email store)
         """
+        request = self._request(
+            professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project
+        )
+        with metrics.trace() as trace:
+            stored = self._stored_email(request, regenerate)
+            if stored is not None:
+                return self._attach_trace(stored, trace)
+            result = self._generate_email(
+                professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project
+            )
+            self._store_email(request, result)
+        return result
+    
+    def _generate_email(
+        self,
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        use_specific_project: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Run the generation pipeline (no email store)."""
+        with metrics.trace() as trace, metrics.span("total"):
+            # Determine template
+            has_paper = paper_title is not None
+            template_type = self._select_template_type(has_paper, use_specific_project)
+            
+            # Get matching project and generate paragraph
+            if use_specific_project:
+                # Force specific project: direct lookup, no retrieval or selection call
+                selected = self._forced_project(use_specific_project)
+            else:
+                # Auto-select best project
+                matching_projects = self.matcher.find_matching_projects(research_domain, paper_title, k=self.candidate_count)
+                if self.matcher.fused:
+                    # One LLM call selects the project and writes the paragraph
+                    selected = self.matcher.select_and_write_paragraph(
+                        self._strip_title(professor_name), research_domain,
+                        paper_title, paper_summary, matching_projects
+                    )
+                else:
+                    selected = self.matcher.select_best_project(
+                        research_domain, paper_title, paper_summary, matching_projects
+                    )
+            
+            # Generate project paragraph
+            project_paragraph = selected.get("project_paragraph")
+            if project_paragraph is None:
+                project_paragraph = self.matcher.generate_project_paragraph(
+                    self._strip_title(professor_name),
+                    research_domain,
+                    paper_title,
+                    paper_summary,
+                    selected
+                )
+            
+            result = self._build_email(
+                template_type, professor_name, university_name, research_domain,
+                paper_title, paper_summary, project_paragraph, selected
+            )
+        return self._attach_trace(result, trace)
+    
+    async def agenerate_email(
+        self,
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        use_specific_project: Optional[str] = None,
+        regenerate: bool = False
+    ) -> Dict[str, str]:
+        """
+        Async variant of generate_email.
         
-        # Determine template
-        has_paper = paper_title is not None
-        template_type = self._select_template_type(has_paper, use_specific_project)
-        
-        # Get matching project and generate paragraph
-        if use_specific_project:
-            # Force specific project
-            matching_projects = self.matcher.find_matching_projects(research_domain, paper_title, k=5)
-            # Find the requested project
-            selected = None
-            for proj in matching_projects:
-                if proj.metadata['project_id'] == use_specific_project or \
-                   proj.metadata['title'].lower() == use_specific_project.lower():
-                    selected = {
-                        "project_document": proj,
-                        "project_title": proj.metadata['title'],
-                        "alignment_explanation": "Specifically requested project"
-                    }
-                    break
+        Retrieval runs on the matcher's embedding executor and the LLM calls
+        use the async client, so concurrent requests overlap instead of
+        blocking the event loop. Takes the same arguments as generate_email.
+        """
+        request = self._request(
+            professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project
+        )
+        with metrics.trace() as trace:
+            # The store is SQLite shared by every worker; keep its calls off the event loop
+            stored = await asyncio.to_thread(self._stored_email, request, regenerate)
+            if stored is not None:
+                return self._attach_trace(stored, trace)
+            result = await self._agenerate_email(
+                professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project
+            )
+            await asyncio.to_thread(self._store_email, request, result)
+        return result
+    
+    async def _agenerate_email(
+        self,
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        use_specific_project: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Async pipeline behind agenerate_email (no email store)."""
+        with metrics.trace() as trace, metrics.span("total"):
+            has_paper = paper_title is not None
+            template_type = self._select_template_type(has_paper, use_specific_project)
             
-            if selected is None:
-                # Fallback to best match
-                selected = self.matcher.select_best_project(
-                    research_domain, paper_title, paper_summary, matching_projects
+            selected = await self._aselect_project(
+                professor_name, research_domain, paper_title, paper_summary,
+                use_specific_project, fused=self.matcher.fused
+            )
+            
+            project_paragraph = selected.get("project_paragraph")
+            if project_paragraph is None:
+                project_paragraph = await self.matcher.agenerate_project_paragraph(
+                    self._strip_title(professor_name),
+                    research_domain,
+                    paper_title,
+                    paper_summary,
+                    selected
                 )
-        else:
-            # Auto-select best project
-            matching_projects = self.matcher.find_matching_projects(research_domain, paper_title, k=3)
-            selected = self.matcher.select_best_project(
-                research_domain, paper_title, paper_summary, matching_projects
+            
+            result = self._build_email(
+                template_type, professor_name, university_name, research_domain,
+                paper_title, paper_summary, project_paragraph, selected
             )
+        return self._attach_trace(result, trace)
+    
+    async def astream_email(
+        self,
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        use_specific_project: Optional[str] = None,
+        regenerate: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate an email as a stream of (event, data) pairs.
         
-        # Generate project paragraph
-        project_paragraph = self.matcher.generate_project_paragraph(
-            professor_name.replace("Dr. ", "").replace("Professor ", ""),
-            research_domain,
-            paper_title,
-            paper_summary,
-            selected
+        Yields "selection" once the project is chosen, one "token" per paragraph
+        chunk as the LLM streams it, and finally "email" with the same dict
+        generate_email returns. Selection always uses the two-call pipeline so
+        it can be reported before the paragraph is written. A stored email
+        yields "selection" and "email" only.
+        """
+        request = self._request(
+            professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project
         )
+        with metrics.trace() as trace:
+            stored = await asyncio.to_thread(self._stored_email, request, regenerate)
+            if stored is not None:
+                yield "selection", {
+                    "selected_project": stored["metadata"]["selected_project"],
+                    "relevance_score": stored["metadata"].get("relevance_score", "N/A"),
+                    "alignment_explanation": ""
+                }
+                yield "email", self._attach_trace(stored, trace)
+                return
+            
+            with metrics.span("total"):
+                has_paper = paper_title is not None
+                template_type = self._select_template_type(has_paper, use_specific_project)
+                
+                selected = await self._aselect_project(
+                    professor_name, research_domain, paper_title, paper_summary,
+                    use_specific_project, fused=False
+                )
+                yield "selection", {
+                    "selected_project": selected["project_title"],
+                    "relevance_score": selected.get("relevance_score", "N/A"),
+                    "alignment_explanation": selected.get("alignment_explanation", "")
+                }
+                
+                parts = []
+                async for token in self.matcher.astream_project_paragraph(
+                    self._strip_title(professor_name),
+                    research_domain,
+                    paper_title,
+                    paper_summary,
+                    selected
+                ):
+                    parts.append(token)
+                    yield "token", {"text": token}
+                
+                result = self._build_email(
+                    template_type, professor_name, university_name, research_domain,
+                    paper_title, paper_summary, "".join(parts).strip(), selected
+                )
+            await asyncio.to_thread(self._store_email, request, result)
+            yield "email", self._attach_trace(result, trace)
+    
+    async def _aselect_project(
+        self,
+        professor_name: str,
+        research_domain: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        use_specific_project: Optional[str],
+        fused: bool
+    ) -> Dict:
+        """Retrieve candidates and choose the project (async)."""
+        if use_specific_project:
+            return self._forced_project(use_specific_project)
         
-        # Build email based on template type
-        if template_type == 1:
-            # Generic template
-            body = self._generate_generic_email(
-                professor_name, university_name, research_domain, project_paragraph
-            )
-        elif template_type == 2:
-            # Paper-referenced generic
-            body = self._generate_paper_generic_email(
-                professor_name, university_name, research_domain, 
-                paper_title, paper_summary, project_paragraph
+        matching_projects = await self.matcher.afind_matching_projects(
+            research_domain, paper_title, k=self.candidate_count
+        )
+        if fused:
+            return await self.matcher.aselect_and_write_paragraph(
+                self._strip_title(professor_name), research_domain,
+                paper_title, paper_summary, matching_projects
             )
-        else:
-            # Paper-referenced with specific project
-            body = self._generate_paper_specific_email(
-                professor_name, university_name, research_domain,
-                paper_title, paper_summary, project_paragraph
+        return await self.matcher.aselect_best_project(
+            research_domain, paper_title, paper_summary, matching_projects
+        )
+    
+    @staticmethod
+    def _request(
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        force_project: Optional[str]
+    ) -> Dict:
+        """Request fields as the email store records them."""
+        return {
+            "professor_name": professor_name,
+            "university_name": university_name,
+            "research_domain": research_domain,
+            "paper_title": paper_title,
+            "paper_summary": paper_summary,
+            "force_project": force_project
+        }
+    
+    @staticmethod
+    def _email_key(request: Dict) -> str:
+        return email_key(
+            request["professor_name"], request["university_name"], request["research_domain"],
+            request["paper_title"], request["paper_summary"], request["force_project"]
+        )
+    
+    def _stored_email(self, request: Dict, regenerate: bool) -> Optional[Dict]:
+        """The stored email for this request, unless regenerating or the store is off."""
+        if self.email_store is None or regenerate:
+            return None
+        with metrics.span("email_store"):
+            stored = self.email_store.get(self._email_key(request))
+        metrics.record_cache("email_store", stored is not None)
+        return stored
+    
+    def _store_email(self, request: Dict, result: Dict):
+        """Append a newly generated email to the store."""
+        if self.email_store is None:
+            return
+        result["metadata"]["email_id"] = self.email_store.put(self._email_key(request), request, result)
+        result["metadata"]["stored"] = False
+    
+    @staticmethod
+    def _strip_title(professor_name: str) -> str:
+        """Remove honorifics; the paragraph prompt adds "Dr." itself."""
+        return professor_name.replace("Dr. ", "").replace("Professor ", "")
+    
+    def _forced_project(self, requested: str) -> Dict:
+        """Fetch the requested project by ID or title; ValueError if it doesn't exist."""
+        with metrics.span("project_lookup"):
+            proj = self.project_index.get(requested, fuzzy=self.fuzzy_project_match)
+        if proj is None:
+            raise ValueError(
+                f"Unknown project '{requested}'. Available project IDs: "
+                f"{', '.join(self.project_index.ids())}"
             )
+        return {
+            "project_document": proj,
+            "project_title": proj.metadata['title'],
+            "alignment_explanation": "Specifically requested project"
+        }
+    
+    def _build_email(
+        self,
+        template_type: int,
+        professor_name: str,
+        university_name: str,
+        research_domain: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        project_paragraph: str,
+        selected: Dict
+    ) -> Dict[str, str]:
+        """Assemble the final email dict from the chosen template."""
+        with metrics.span("template"):
+            # Build email based on template type
+            if template_type == 1:
+                # Generic template
+                body = self._generate_generic_email(
+                    professor_name, university_name, research_domain, project_paragraph
+                )
+            elif template_type == 2:
+                # Paper-referenced generic
+                body = self._generate_paper_generic_email(
+                    professor_name, university_name, research_domain, 
+                    paper_title, paper_summary, project_paragraph
+                )
+            else:
+                # Paper-referenced with specific project
+                body = self._generate_paper_specific_email(
+                    professor_name, university_name, research_domain,
+                    paper_title, paper_summary, project_paragraph
+                )
+        metrics.record_email(template_type)
         
         return {
             "subject": self.SUBJECT,
@@ -147,6 +455,12 @@ Zain Azhar"""
             }
         }
     
+    @staticmethod
+    def _attach_trace(result: Dict, trace: metrics.Trace) -> Dict:
+        """Add per-stage timings, token counts and cache results to the email metadata."""
+        result["metadata"].update(trace.report())
+        return result
+    
     def _generate_generic_email(
         self, prof_name: str, university: str, research_area: str, project_para: str
     ) -> str:
@@ -0,0 +1,214 @@
+"""
+Generated email store for RAGmail.
+Append-only SQLite record of every generated email, keyed by the normalized
+professor request so the same professor isn't generated for twice.
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+from src.llm_cache import make_cache_key
+from src.db import open_shared_db
+
+# Request fields kept with every stored email
+REQUEST_FIELDS = (
+    "professor_name",
+    "university_name",
+    "research_domain",
+    "paper_title",
+    "paper_summary",
+    "force_project",
+)
+# Result metadata worth keeping (per-request timings and token counts are not)
+STORED_METADATA = ("template_type", "selected_project", "relevance_score")
+
+HONORIFICS = re.compile(r"^(?:dr|prof|professor|mr|mrs|ms)\.?\s+", re.IGNORECASE)
+
+
+def normalize_field(value: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ('' for missing values)."""
+    if not value:
+        return ""
+    return " ".join(re.sub(r"[^\w]+", " ", value.lower()).split())
+
+
+def normalize_professor(name: Optional[str]) -> str:
+    """Normalized name without leading honorifics ("Dr. Jane Smith" -> "jane smith")."""
+    name = (name or "").strip()
+    while True:
+        stripped = HONORIFICS.sub("", name)
+        if stripped == name:
+            break
+        name = stripped
+    return normalize_field(name)
+
+
+def email_key(
+    professor_name: str,
+    university_name: str,
+    research_domain: str,
+    paper_title: Optional[str] = None,
+    paper_summary: Optional[str] = None,
+    force_project: Optional[str] = None
+) -> str:
+    """
+    Dedup key of a request: normalized professor, university, research domain
+    and paper title and summary (and the forced project); every field that
+    reaches the prompt changes the email.
+    """
+    return make_cache_key(
+        normalize_professor(professor_name),
+        normalize_field(university_name),
+        normalize_field(research_domain),
+        normalize_field(paper_title),
+        normalize_field(paper_summary),
+        normalize_field(force_project)
+    )
+
+
+class EmailStore:
+    """
+    Every generated email, indexed by request key.
+
+    Records are only appended; regenerating a professor adds a newer record
+    and lookups return the latest one for the key.
+    """
+
+    def __init__(self, path: str = "generated_emails/emails.sqlite"):
+        self._lock = threading.Lock()
+
+        self._db = open_shared_db(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS emails (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                professor_name TEXT,
+                university_name TEXT,
+                research_domain TEXT,
+                paper_title TEXT,
+                paper_summary TEXT,
+                force_project TEXT,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_emails_key ON emails (key, id);
+            CREATE INDEX IF NOT EXISTS idx_emails_professor ON emails (professor_name);
+        """)
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Latest email stored for key, shaped like an EmailGenerator result."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM emails WHERE key = ? ORDER BY id DESC LIMIT 1", (key,)
+            ).fetchone()
+            return self._to_result(row) if row is not None else None
+
+    def put(self, key: str, request: Dict, result: Dict) -> int:
+        """Append a generated email; returns its record ID."""
+        metadata = {name: result["metadata"].get(name) for name in STORED_METADATA}
+        values = [request.get(field) or None for field in REQUEST_FIELDS]
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO emails (key, professor_name, university_name, research_domain, paper_title, "
+                "paper_summary, force_project, subject, body, metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, *values, result["subject"], result["body"],
+                 json.dumps(metadata, ensure_ascii=False), time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def list(self, limit: int = 50, offset: int = 0, professor: Optional[str] = None, latest_only: bool = True) -> List[Dict]:
+        """
+        Stored emails, newest first.
+
+        Args:
+            professor: Only emails whose professor name contains this text (case-insensitive)
+            latest_only: Skip records superseded by a regeneration of the same request
+        """
+        query = "SELECT * FROM emails"
+        conditions, params = [], []
+        if latest_only:
+            conditions.append("id IN (SELECT MAX(id) FROM emails GROUP BY key)")
+        if professor:
+            conditions.append("professor_name LIKE ?")
+            params.append(f"%{professor}%")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit, offset)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def count(self) -> int:
+        """Number of distinct requests with a stored email."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(DISTINCT key) FROM emails").fetchone()[0]
+
+    def dump(self, f: TextIO, fmt: str = "jsonl", latest_only: bool = True) -> int:
+        """Write stored emails to a text stream as "jsonl" or "csv", oldest first; returns the record count."""
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unsupported export format: {fmt} (use jsonl or csv)")
+
+        query = "SELECT * FROM emails"
+        if latest_only:
+            query += " WHERE id IN (SELECT MAX(id) FROM emails GROUP BY key)"
+        with self._lock:
+            records = [self._to_record(row) for row in self._db.execute(query + " ORDER BY id")]
+
+        if fmt == "jsonl":
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            fields = ["id", "created_at", *REQUEST_FIELDS, "subject", "body", *STORED_METADATA]
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for record in records:
+                writer.writerow({**record, **record["metadata"]})
+        return len(records)
+
+    def export(self, path: str, latest_only: bool = True) -> int:
+        """Write stored emails to a .jsonl or .csv file; returns the record count."""
+        file_path = Path(path)
+        fmt = file_path.suffix.lower().lstrip(".")
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unsupported export file type: {file_path.suffix} (use .jsonl or .csv)")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8', newline='') as f:
+            return self.dump(f, fmt, latest_only)
+
+    def _to_record(self, row) -> Dict:
+        (email_id, _, *request, subject, body, metadata, created_at) = row
+        return {
+            "id": email_id,
+            "created_at": created_at,
+            **dict(zip(REQUEST_FIELDS, request)),
+            "subject": subject,
+            "body": body,
+            "metadata": json.loads(metadata)
+        }
+
+    def _to_result(self, row) -> Dict:
+        record = self._to_record(row)
+        metadata = dict(record["metadata"])
+        metadata.update({"stored": True, "email_id": record["id"], "stored_at": record["created_at"]})
+        return {"subject": record["subject"], "body": record["body"], "metadata": metadata}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def email_store_from_env() -> Optional[EmailStore]:
+    """The store configured by RAGMAIL_EMAIL_STORE* variables (None when disabled)."""
+    if os.getenv("RAGMAIL_EMAIL_STORE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return EmailStore(os.getenv("RAGMAIL_EMAIL_STORE_PATH", "generated_emails/emails.sqlite"))
@@ -0,0 +1,109 @@
+"""
+Query embedding cache for RAGmail.
+Two tiers: an in-memory LRU in front of a SQLite file on disk.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Dict
+from src.db import open_shared_db
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and collapse whitespace so trivial variants share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """Content-addressed cache of embeddings keyed by model name + normalized text."""
+
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[str] = "embedding_cache",
+        max_memory_items: int = 2048
+    ):
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        # Disk tier (disabled when cache_dir is None)
+        self._db: Optional[sqlite3.Connection] = None
+        if cache_dir is not None:
+            self._db = open_shared_db(str(Path(cache_dir) / "query_embeddings.sqlite"))
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def key(self, text: str) -> str:
+        """Cache key for a text under this cache's model."""
+        payload = f"{self.model_name}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, or None on a miss."""
+        key = self.key(text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector: List[float]):
+        """Store an embedding in both tiers."""
+        key = self.key(text)
+        with self._lock:
+            self._remember(key, list(vector))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, array("f", vector).tobytes())
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and tier sizes."""
+        with self._lock:
+            disk_size = 0
+            if self._db is not None:
+                disk_size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.hits - self.disk_hits,
+                "disk_hits": self.disk_hits,
+                "memory_size": len(self._memory),
+                "disk_size": disk_size
+            }
@@ -0,0 +1,93 @@
+"""
+Incremental indexing for RAGmail.
+Keeps a manifest of document IDs and content hashes so only changed documents are re-embedded.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List
+from langchain_core.documents import Document
+
+
+def content_hash(doc: Document) -> str:
+    """Hash of a document's text and metadata; changes whenever either changes."""
+    payload = json.dumps(
+        {"content": doc.page_content, "metadata": doc.metadata},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IncrementalIndexer:
+    """Sync the vector store with the loader's documents, embedding only what changed."""
+
+    MANIFEST_NAME = "index_manifest.json"
+
+    def __init__(self, loader, vector_store):
+        self.loader = loader
+        self.vector_store = vector_store
+        self.manifest_path = Path(vector_store.index_directory) / self.MANIFEST_NAME
+
+    def load_manifest(self) -> Dict:
+        """Read the manifest, or an empty one if the index was never built."""
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: Dict):
+        """Write the manifest atomically."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync(self, full: bool = False) -> Dict[str, List[str]]:
+        """
+        Bring the index up to date with the source documents.
+
+        Args:
+            full: Drop the collection and re-embed every document
+
+        Returns:
+            Dict of doc IDs that were 'added', 'updated', 'removed' and left 'unchanged'
+        """
+        documents = self.loader.load_all_documents()
+        current = {doc.metadata["doc_id"]: doc for doc in documents}
+        hashes = {doc_id: content_hash(doc) for doc_id, doc in current.items()}
+
+        manifest = self.load_manifest()
+        model = getattr(self.vector_store, "embedding_model", None)
+        if manifest.get("embedding_model") != model:
+            # Vectors from a different model can't be mixed with new ones
+            full = True
+        indexed = {} if full else manifest.get("documents", {})
+
+        added = [doc_id for doc_id in current if doc_id not in indexed]
+        updated = [doc_id for doc_id in current if doc_id in indexed and indexed[doc_id] != hashes[doc_id]]
+        removed = [doc_id for doc_id in indexed if doc_id not in current]
+        unchanged = [doc_id for doc_id in current if indexed.get(doc_id) == hashes[doc_id]]
+
+        self.vector_store.open_vectorstore()
+        if full:
+            print(f"Full rebuild: embedding {len(current)} documents...")
+            self.vector_store.reset()
+        else:
+            print(
+                f"Incremental update: {len(added)} new, {len(updated)} changed, "
+                f"{len(removed)} removed, {len(unchanged)} unchanged"
+            )
+
+        self.vector_store.delete_documents(updated + removed)
+        self.vector_store.add_documents([current[doc_id] for doc_id in added + updated])
+        self.vector_store.save_parent_documents(self.loader.load_parent_documents())
+        self.vector_store.build_lexical_index(documents)
+        self.vector_store.build_tag_index(documents)
+
+        self.save_manifest({"embedding_model": model, "documents": hashes})
+
+        return {"added": added, "updated": updated, "removed": removed, "unchanged": unchanged}
@@ -0,0 +1,361 @@
+"""
+Durable background jobs for RAGmail.
+Batch generations are queued in SQLite and worked off by a pool of workers,
+so they survive client disconnects and worker restarts.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from src.batch import normalize_row, generate_row
+from src.llm_cache import make_cache_key
+from src.db import open_shared_db
+
+# Row states; a job is finished once every row is done or failed
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+    """
+    Jobs and their rows in a SQLite file shared by every API worker process.
+
+    Workers claim one row at a time under a lease. A row whose worker died
+    (lease expired) is claimed again, up to max_attempts. Jobs submitted with
+    an idempotency key are deduplicated: the same key and rows return the
+    existing job, and a changed submission under the same key reuses the
+    results of rows it has already completed.
+    """
+
+    def __init__(
+        self,
+        path: str = "jobs/jobs.sqlite",
+        lease_seconds: float = 300.0,
+        max_attempts: int = 3
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        # Autocommit mode so claims can use explicit BEGIN IMMEDIATE across processes
+        self._db = open_shared_db(path, autocommit=True)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                idempotency_key TEXT,
+                payload_hash TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (idempotency_key, created_at);
+            CREATE TABLE IF NOT EXISTS job_rows (
+                job_id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                row_key TEXT NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                reused INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner TEXT,
+                lease_until REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, row)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_rows_status ON job_rows (status, lease_until);
+        """)
+
+    def _write(self, statements: Callable[[sqlite3.Connection], object]):
+        """Run statements in one write transaction (serialized across processes)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    # -- submission ------------------------------------------------------
+
+    def submit(self, rows: List[Dict], idempotency_key: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Queue a job for professor rows (see batch.PROFESSOR_FIELDS).
+
+        Returns:
+            (job ID, whether an existing job was returned instead of a new one)
+        """
+        rows = [normalize_row(row) for row in rows]
+        row_keys = [make_cache_key(row) for row in rows]
+        payload_hash = make_cache_key(row_keys)
+
+        def statements(db: sqlite3.Connection) -> Tuple[str, bool]:
+            now = time.time()
+            previous = []
+            if idempotency_key:
+                previous = db.execute(
+                    "SELECT id, payload_hash FROM jobs WHERE idempotency_key = ? ORDER BY created_at DESC",
+                    (idempotency_key,)
+                ).fetchall()
+            if previous and previous[0][1] == payload_hash:
+                # Same submission again: keep finished rows, give failed ones another try
+                job_id = previous[0][0]
+                db.execute(
+                    "UPDATE job_rows SET status = ?, error = NULL, attempts = 0, updated_at = ? "
+                    "WHERE job_id = ? AND status = ?",
+                    (PENDING, now, job_id, FAILED)
+                )
+                return job_id, True
+
+            # Completed rows of earlier submissions under this key, by row content
+            completed = {}
+            for job_id, _ in reversed(previous):
+                for row_key, result in db.execute(
+                    "SELECT row_key, result FROM job_rows WHERE job_id = ? AND status = ?",
+                    (job_id, DONE)
+                ):
+                    completed[row_key] = result
+
+            job_id = uuid.uuid4().hex
+            db.execute(
+                "INSERT INTO jobs (id, idempotency_key, payload_hash, total, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, idempotency_key, payload_hash, len(rows), now)
+            )
+            db.executemany(
+                "INSERT INTO job_rows (job_id, row, row_key, request, status, result, reused, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        job_id, i, row_key, json.dumps(row, ensure_ascii=False),
+                        DONE if row_key in completed else PENDING,
+                        completed.get(row_key), int(row_key in completed), now
+                    )
+                    for i, (row, row_key) in enumerate(zip(rows, row_keys))
+                ]
+            )
+            return job_id, False
+
+        return self._write(statements)
+
+    # -- workers ---------------------------------------------------------
+
+    def claim(self, owner: str) -> Optional[Tuple[str, int, Dict]]:
+        """Lease the oldest runnable row to owner: (job ID, row, request), or None."""
+        def statements(db: sqlite3.Connection):
+            now = time.time()
+            # Rows whose worker died too often are given up on
+            db.execute(
+                "UPDATE job_rows SET status = ?, error = ?, owner = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, f"Abandoned after {self.max_attempts} interrupted attempts", now,
+                 RUNNING, now, self.max_attempts)
+            )
+            row = db.execute(
+                "SELECT r.job_id, r.row, r.request FROM job_rows r JOIN jobs j ON j.id = r.job_id "
+                "WHERE r.status = ? OR (r.status = ? AND r.lease_until < ?) "
+                "ORDER BY j.created_at, r.row LIMIT 1",
+                (PENDING, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE job_rows SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE job_id = ? AND row = ?",
+                (RUNNING, owner, now + self.lease_seconds, now, row[0], row[1])
+            )
+            return row[0], row[1], json.loads(row[2])
+
+        return self._write(statements)
+
+    def renew(self, owner: str, rows: List[Tuple[str, int]]):
+        """Extend owner's leases on the given (job ID, row) pairs it is still working on."""
+        if not rows:
+            return
+        now = time.time()
+        self._write(lambda db: db.executemany(
+            "UPDATE job_rows SET lease_until = ? WHERE job_id = ? AND row = ? AND owner = ? AND status = ?",
+            [(now + self.lease_seconds, job_id, row, owner, RUNNING) for job_id, row in rows]
+        ))
+
+    def finish(self, job_id: str, row: int, owner: str, record: Dict):
+        """Store a row's outcome (ignored if the lease was lost to another worker)."""
+        status = DONE if record.get("success") else FAILED
+        result = json.dumps(record["email"], ensure_ascii=False) if status == DONE else None
+        self._write(lambda db: db.execute(
+            "UPDATE job_rows SET status = ?, result = ?, error = ?, owner = NULL, lease_until = NULL, "
+            "updated_at = ? WHERE job_id = ? AND row = ? AND owner = ? AND status = ?",
+            (status, result, record.get("error"), time.time(), job_id, row, owner, RUNNING)
+        ))
+
+    def release(self, owner: str):
+        """Hand owner's unfinished rows back to the queue (clean shutdown)."""
+        self._write(lambda db: db.execute(
+            "UPDATE job_rows SET status = ?, owner = NULL, lease_until = NULL, attempts = attempts - 1, "
+            "updated_at = ? WHERE owner = ? AND status = ?",
+            (PENDING, time.time(), owner, RUNNING)
+        ))
+
+    # -- status ----------------------------------------------------------
+
+    def get(self, job_id: str, include_results: bool = True) -> Optional[Dict]:
+        """Progress counts and (optionally) the finished rows of a job, or None if unknown."""
+        with self._lock:
+            job = self._db.execute(
+                "SELECT id, idempotency_key, total, created_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM job_rows WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            updated_at = self._db.execute(
+                "SELECT MAX(updated_at) FROM job_rows WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            rows = []
+            if include_results:
+                rows = self._db.execute(
+                    "SELECT row, request, status, result, error, reused FROM job_rows "
+                    "WHERE job_id = ? AND status IN (?, ?) ORDER BY row",
+                    (job_id, DONE, FAILED)
+                ).fetchall()
+
+        counts = {state: counts.get(state, 0) for state in (PENDING, RUNNING, DONE, FAILED)}
+        if counts[DONE] + counts[FAILED] == job[2]:
+            status = "completed"
+        elif counts[PENDING] == job[2]:
+            status = "queued"
+        else:
+            status = "running"
+
+        results = []
+        for row, request, state, result, error, reused in rows:
+            record = {
+                "row": row,
+                "professor_name": json.loads(request).get("professor_name"),
+                "success": state == DONE,
+                "reused": bool(reused)
+            }
+            if state == DONE:
+                record["email"] = json.loads(result)
+            else:
+                record["error"] = error
+            results.append(record)
+
+        return {
+            "job_id": job[0],
+            "idempotency_key": job[1],
+            "status": status,
+            "total": job[2],
+            "counts": counts,
+            "created_at": job[3],
+            "updated_at": updated_at,
+            "results": results
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobWorkerPool:
+    """
+    Asyncio workers that generate queued rows in this process.
+
+    Every API worker process may run a pool on the same JobStore; rows are
+    claimed atomically, and rows of a crashed process are picked up again
+    once their lease expires. Rows run in the batch priority lane.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        get_generator: Callable[[], Awaitable],
+        workers: int = 2,
+        poll_seconds: float = 1.0
+    ):
+        self.store = store
+        self.get_generator = get_generator
+        self.workers = max(1, workers)
+        self.poll_seconds = poll_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        # Rows being generated right now; only these leases are renewed
+        self._active: Set[Tuple[str, int]] = set()
+
+    def start(self):
+        """Start the workers and the lease heartbeat on the running event loop."""
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        """Cancel the workers and return their unfinished rows to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                # Store calls are BEGIN IMMEDIATE transactions; keep them off the event loop
+                await asyncio.to_thread(self.store.renew, self.owner, list(self._active))
+            except sqlite3.Error as e:
+                print(f"✗ Job lease renewal failed: {e}")
+
+    async def _work(self):
+        while True:
+            try:
+                generator = await self.get_generator()
+                claimed = await asyncio.to_thread(self.store.claim, self.owner)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"✗ Job worker waiting: {e}")
+                await asyncio.sleep(self.poll_seconds * 5)
+                continue
+            if claimed is None:
+                await asyncio.sleep(self.poll_seconds)
+                continue
+
+            job_id, row, request = claimed
+            self._active.add((job_id, row))
+            try:
+                record = await generate_row(generator, row, request)
+                await self._finish(job_id, row, record)
+            finally:
+                self._active.discard((job_id, row))
+
+    async def _finish(self, job_id: str, row: int, record: Dict, attempts: int = 3):
+        """
+        Store a row's outcome, retrying briefly. If it still can't be written
+        the row is left to its lease: it stops being renewed and another
+        worker picks it up once the lease expires.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                await asyncio.to_thread(self.store.finish, job_id, row, self.owner, record)
+                return
+            except sqlite3.Error as e:
+                print(f"✗ Saving job {job_id} row {row} failed (attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    await asyncio.sleep(self.poll_seconds * attempt)
+
+
+def job_store_from_env() -> JobStore:
+    """The job store configured by RAGMAIL_JOBS_* variables."""
+    return JobStore(
+        path=os.getenv("RAGMAIL_JOBS_PATH", "jobs/jobs.sqlite"),
+        lease_seconds=float(os.getenv("RAGMAIL_JOB_LEASE_SECONDS", "300")),
+        max_attempts=int(os.getenv("RAGMAIL_JOB_MAX_ATTEMPTS", "3"))
+    )
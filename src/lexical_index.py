@@ -0,0 +1,152 @@
+"""
+Sparse lexical (BM25) index for RAGmail.
+Catches exact technical terms (e.g. "LangGraph", "RLHF") that dense embeddings tend to miss.
+"""
+
+import os
+import re
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from langchain_core.documents import Document
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.+#][a-z0-9]+)*[+#]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the
+this to was were will with using use used based via my our your their we i
+""".split())
+
+# Metadata fields that hold curated terms; they are counted extra times
+BOOSTED_FIELDS = {"keywords": 2, "domains": 2, "title": 2}
+
+# The only metadata kept per document (for filters); the rest is resolved through the vector store
+FILTER_FIELDS = ("source", "doc_id", "parent_id", "project_id")
+
+
+def _filter_metadata(metadata: Dict) -> Dict:
+    return {key: metadata[key] for key in FILTER_FIELDS if key in metadata}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; compound terms (multi-agent) also emit their parts."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_.]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Compact inverted index with Okapi BM25 scoring, persisted as JSON."""
+
+    FILE_NAME = "lexical_index.json"
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.avg_length = 0.0
+
+    def build(self, documents: List[Document]):
+        """(Re)build the index from documents carrying a 'doc_id'."""
+        self.doc_ids, self.metadatas, self.doc_lengths, self.postings = [], [], [], {}
+        for idx, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            for field, boost in BOOSTED_FIELDS.items():
+                value = doc.metadata.get(field)
+                if value:
+                    tokens.extend(tokenize(str(value)) * boost)
+
+            self.doc_ids.append(doc.metadata["doc_id"])
+            self.metadatas.append(_filter_metadata(doc.metadata))
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append([idx, tf])
+
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def save(self, directory: str):
+        """Write the index atomically to directory/FILE_NAME."""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = Path(directory) / self.FILE_NAME
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "doc_ids": self.doc_ids,
+                "metadatas": self.metadatas,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        """Load a saved index, or None if there isn't one."""
+        path = Path(directory) / cls.FILE_NAME
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.doc_ids = data["doc_ids"]
+        # Indexes saved before FILTER_FIELDS held every metadata field
+        index.metadatas = [_filter_metadata(metadata) for metadata in data["metadatas"]]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        filter_dict: Optional[Dict] = None,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Top-k (doc_id, BM25 score) pairs for the query, optionally among doc_ids only.
+
+        filter_dict may only use FILTER_FIELDS.
+        """
+        unsupported = set(filter_dict or {}) - set(FILTER_FIELDS)
+        if unsupported:
+            raise ValueError(f"BM25 filters support only {', '.join(FILTER_FIELDS)} (got {', '.join(sorted(unsupported))})")
+
+        n_docs = len(self.doc_ids)
+        if n_docs == 0:
+            return []
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / self.avg_length)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if filter_dict:
+            scores = {
+                idx: score for idx, score in scores.items()
+                if all(self.metadatas[idx].get(key) == value for key, value in filter_dict.items())
+            }
+
+        if doc_ids is not None:
+            allowed = set(doc_ids)
+            scores = {idx: score for idx, score in scores.items() if self.doc_ids[idx] in allowed}
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[idx], score) for idx, score in ranked]
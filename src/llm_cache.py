@@ -0,0 +1,151 @@
+"""
+LLM response cache for RAGmail.
+SQLite-backed store with TTL/size eviction and optional near-duplicate lookup.
+"""
+
+import json
+import math
+import time
+import hashlib
+import threading
+from array import array
+from typing import Dict, List, Optional
+from src.db import open_shared_db
+
+
+def make_cache_key(*parts) -> str:
+    """Stable hash of JSON-serializable key parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class LLMResponseCache:
+    """
+    Cache of LLM completions keyed by prompt version, model, temperature and inputs.
+
+    Entries older than ttl_seconds are ignored and purged; once the store holds
+    more than max_entries, the least recently used entries are evicted. When
+    similarity_threshold is set, a miss on the exact key falls back to entries
+    in the same group (same inputs except the research area) whose research-area
+    embedding is at least that similar.
+    """
+
+    def __init__(
+        self,
+        path: str = "llm_cache/responses.sqlite",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        similarity_threshold: Optional[float] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._db = open_shared_db(path)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                group_key TEXT,
+                embedding BLOB,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_group ON responses (group_key);
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+        """)
+        self._db.commit()
+
+    def get(
+        self,
+        key: str,
+        group_key: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ) -> Optional[str]:
+        """Return a cached completion for key (or a near-duplicate), else None."""
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content FROM responses WHERE key = ? AND created_at >= ?",
+                (key, cutoff)
+            ).fetchone()
+            if row is not None:
+                self._touch(key, now)
+                self.hits += 1
+                return row[0]
+
+            if self.similarity_threshold is not None and group_key and embedding is not None:
+                best_key, best_content, best_score = None, None, self.similarity_threshold
+                for candidate_key, blob, content in self._db.execute(
+                    "SELECT key, embedding, content FROM responses "
+                    "WHERE group_key = ? AND embedding IS NOT NULL AND created_at >= ?",
+                    (group_key, cutoff)
+                ):
+                    score = _cosine(embedding, array("f", blob))
+                    if score >= best_score:
+                        best_key, best_content, best_score = candidate_key, content, score
+                if best_key is not None:
+                    self._touch(best_key, now)
+                    self.hits += 1
+                    self.near_hits += 1
+                    return best_content
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: str,
+        content: str,
+        group_key: Optional[str] = None,
+        embedding: Optional[List[float]] = None
+    ):
+        """Store a completion and evict expired / excess entries."""
+        now = time.time()
+        blob = array("f", embedding).tobytes() if embedding is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, group_key, embedding, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, group_key, blob, content, now, now)
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _touch(self, key: str, now: float):
+        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "size": size
+            }
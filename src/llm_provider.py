@@ -0,0 +1,181 @@
+"""
+LLM providers for RAGmail.
+Groq for real use, plus a local deterministic stand-in for offline benchmarking and CI.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+PROVIDERS = ("groq", "fake")
+
+DEFAULT_FAKE_PARAGRAPH = (
+    "Your work in this area closely aligns with my project {title}, where I designed and "
+    "implemented the core pipeline end to end. Building it gave me hands-on experience with "
+    "the methods your group uses, and I would be excited to extend these ideas under your supervision."
+)
+
+
+def create_llm(temperature: float = 0.7) -> BaseChatModel:
+    """Create the chat model selected by RAGMAIL_LLM_PROVIDER (groq | fake)."""
+    provider = os.getenv("RAGMAIL_LLM_PROVIDER", "groq").lower()
+
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            temperature=temperature,
+            model_name=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
+            api_key=os.getenv("GROQ_API_KEY"),
+            # Retries are handled by the LLM scheduler (with rate-limit awareness)
+            max_retries=0
+        )
+
+    if provider == "fake":
+        responses = {}
+        responses_path = os.getenv("RAGMAIL_FAKE_RESPONSES")
+        if responses_path:
+            with open(responses_path, 'r', encoding='utf-8') as f:
+                responses = json.load(f)
+        return FakeChatModel(
+            temperature=temperature,
+            latency=float(os.getenv("RAGMAIL_FAKE_LATENCY_MS", "0")) / 1000,
+            tokens_per_second=float(os.getenv("RAGMAIL_FAKE_TOKENS_PER_SEC", "0")),
+            error_rate=float(os.getenv("RAGMAIL_FAKE_ERROR_RATE", "0")),
+            responses=responses
+        )
+
+    raise ValueError(f"Unknown LLM provider: {provider} (use one of {', '.join(PROVIDERS)})")
+
+
+class FakeRateLimitError(Exception):
+    """Simulated HTTP 429 from the fake provider (shaped like the provider SDK errors)."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached (simulated); retry after {retry_after}s")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model that answers RAGmail's prompts.
+
+    Recognizes the selection, fused and paragraph prompts and returns canned
+    responses (always choosing project 1 unless overridden). Simulates a
+    time-to-first-token of `latency` seconds and `tokens_per_second` output
+    throughput (0 = instant), and reports token usage like a real provider.
+    Canned text can be overridden per prompt kind via `responses`
+    ({"selection": ..., "fused": ..., "paragraph": ...}); "{title}" is replaced
+    with the first candidate's title. With `error_rate` > 0, that fraction of
+    calls fails with a simulated rate limit carrying a `retry_after` hint.
+    """
+
+    model_name: str = "fake-ragmail"
+    temperature: float = 0.7
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    responses: Dict[str, str] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-ragmail"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = str(messages[0].content) if messages else ""
+        prompt = str(messages[-1].content) if messages else ""
+        match = re.search(r"^(?:Project|Title): (.+)$", prompt, re.MULTILINE)
+        title = match.group(1).strip() if match else "my project"
+
+        paragraph = self.responses.get("paragraph", DEFAULT_FAKE_PARAGRAPH).replace("{title}", title)
+        if '"paragraph"' in system:
+            kind = "fused"
+        elif "selected_project_number" in system:
+            kind = "selection"
+        else:
+            return paragraph
+
+        if kind in self.responses:
+            return self.responses[kind].replace("{title}", title)
+        result = {
+            "selected_project_number": 1,
+            "project_title": title,
+            "alignment_explanation": f"{title} uses methods that directly overlap with the professor's research.",
+            "key_technologies": ["Python"],
+            "relevance_score": 8
+        }
+        if kind == "fused":
+            result["paragraph"] = paragraph
+        return json.dumps(result)
+
+    def _maybe_fail(self):
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            raise FakeRateLimitError(self.retry_after)
+
+    def _tokens(self, text: str) -> List[str]:
+        return re.findall(r"\S+\s*", text) or [text]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        input_tokens = sum(_estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = len(self._tokens(text))
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    def _result(self, messages: List[BaseMessage], text: str) -> ChatResult:
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._maybe_fail()
+        text = self._respond(messages)
+        time.sleep(self.latency + len(self._tokens(text)) * self._token_delay())
+        return self._result(messages, text)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._maybe_fail()
+        text = self._respond(messages)
+        await asyncio.sleep(self.latency + len(self._tokens(text)) * self._token_delay())
+        return self._result(messages, text)
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        text = self._respond(messages)
+        time.sleep(self.latency)
+        for token in self._tokens(text):
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        text = self._respond(messages)
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(text):
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
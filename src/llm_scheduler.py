@@ -0,0 +1,355 @@
+"""
+Rate-limit-aware scheduling of LLM calls for RAGmail.
+Every call waits for request/token budget under the provider quota, retries
+rate limits and transient errors with backoff, and interactive requests are
+served before batch work.
+"""
+
+import os
+import time
+import bisect
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from src import metrics
+
+# Priority lanes: lower values are served first
+INTERACTIVE = 0
+BATCH = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("ragmail_llm_priority", default=INTERACTIVE)
+
+QUEUE_SECONDS = metrics.REGISTRY.histogram(
+    "ragmail_llm_queue_seconds", "Time LLM calls waited for rate-limit budget", ["lane"]
+)
+RETRIES = metrics.REGISTRY.counter(
+    "ragmail_llm_retries_total", "LLM call retries by reason", ["reason"]
+)
+
+
+@contextmanager
+def llm_priority(lane: int):
+    """Run LLM calls made inside the block in the given lane (INTERACTIVE or BATCH)."""
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMRateLimitError(Exception):
+    """The provider kept rate-limiting a call after every retry."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """The provider's retry-after hint (seconds), if the error carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+def is_rate_limit(error: Exception) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, provider overload and dropped connections are worth retrying."""
+    if is_rate_limit(error) or _status_code(error) in RETRYABLE_STATUS:
+        return True
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` / 60 per second up to `per_minute`."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (oversized requests wait for a full bucket)."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float):
+        # May go negative for oversized requests; later callers then wait longer
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls shared by every matcher in the process.
+
+    Callers are admitted in (lane, arrival) order once the requests-per-minute
+    and tokens-per-minute buckets have room and fewer than `max_concurrency`
+    calls are in flight; until then they wait (backpressure) instead of
+    failing. Token use is reserved from an estimate and corrected from the
+    response's usage metadata. Rate limits and transient errors are retried
+    with jittered exponential backoff; a 429 also pauses every caller for the
+    provider's retry-after.
+
+    A limit of 0 disables that bucket.
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(
+        self,
+        requests_per_minute: float = 30,
+        tokens_per_minute: float = 12000,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+
+    # -- admission -------------------------------------------------------
+
+    def _enqueue(self) -> Tuple[int, int]:
+        ticket = (_priority.get(), next(self._sequence))
+        with self._lock:
+            bisect.insort(self._queue, ticket)
+        return ticket
+
+    def _try_acquire(self, ticket: Tuple[int, int], tokens: float) -> float:
+        """Admit the ticket (returns 0) or return how long to wait before retrying."""
+        with self._lock:
+            if self._queue[0] != ticket:
+                return self.POLL_SECONDS
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self._in_flight >= self.max_concurrency:
+                wait = max(wait, self.POLL_SECONDS)
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return min(wait, self.POLL_SECONDS * 4)
+
+            self._queue.pop(0)
+            self._in_flight += 1
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def _abandon(self, ticket: Tuple[int, int]):
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+
+    def _release(self, reserved: float, used: Optional[float]):
+        """Free the slot and correct the token reservation with actual usage."""
+        with self._lock:
+            self._in_flight -= 1
+            if self.tokens is not None and used is not None:
+                if used > reserved:
+                    self.tokens.take(used - reserved)
+                else:
+                    self.tokens.give_back(reserved - used)
+
+    def acquire(self, tokens: float):
+        """Block until the call may start."""
+        ticket, start = self._enqueue(), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    break
+                time.sleep(wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        QUEUE_SECONDS.observe(time.monotonic() - start, lane=LANE_NAMES[ticket[0]])
+
+    async def aacquire(self, tokens: float):
+        """Wait (without blocking the event loop) until the call may start."""
+        ticket, start = self._enqueue(), time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        QUEUE_SECONDS.observe(time.monotonic() - start, lane=LANE_NAMES[ticket[0]])
+
+    # -- retries ---------------------------------------------------------
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        """
+        Delay before retrying, or raise if the error isn't retryable or the
+        retries are used up.
+        """
+        rate_limited = is_rate_limit(error)
+        retry_after = retry_after_seconds(error)
+        if not is_retryable(error):
+            raise error
+        if attempt >= self.max_retries:
+            if rate_limited:
+                raise LLMRateLimitError(
+                    f"LLM provider rate limit persisted after {attempt} retries: {error}",
+                    retry_after=retry_after
+                ) from error
+            raise error
+
+        RETRIES.inc(reason="rate_limit" if rate_limited else "transient")
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, 0.1 * retry_after + 0.05)
+        else:
+            delay = random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** attempt)
+        if rate_limited:
+            # Everyone else is over the quota too; hold all callers back
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    @staticmethod
+    def _used_tokens(result: Any) -> Optional[float]:
+        usage = getattr(result, "usage_metadata", None) or {}
+        total = usage.get("total_tokens")
+        return float(total) if total else None
+
+    def run(self, call: Callable[[], Any], tokens: float) -> Any:
+        """Run a synchronous LLM call under the limits, retrying when appropriate."""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            used = None
+            try:
+                result = call()
+                used = self._used_tokens(result)
+                return result
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+            finally:
+                self._release(tokens, used)
+            attempt += 1
+            time.sleep(delay)
+
+    async def arun(self, call: Callable[[], Any], tokens: float) -> Any:
+        """Async variant of run; `call` returns an awaitable."""
+        attempt = 0
+        while True:
+            await self.aacquire(tokens)
+            used = None
+            try:
+                result = await call()
+                used = self._used_tokens(result)
+                return result
+            except Exception as e:
+                delay = self._backoff(e, attempt)
+            finally:
+                self._release(tokens, used)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def astream(self, call: Callable[[], AsyncIterator], tokens: float) -> AsyncIterator:
+        """
+        Stream chunks from `call()` under the limits.
+
+        Failures before the first chunk are retried; once output has been
+        yielded the error is raised to the caller.
+        """
+        attempt = 0
+        while True:
+            await self.aacquire(tokens)
+            used, started = 0.0, False
+            try:
+                async for chunk in call():
+                    started = True
+                    used += self._used_tokens(chunk) or 0.0
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._backoff(e, attempt)
+            finally:
+                self._release(tokens, used or None)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, in-flight calls and remaining budget."""
+        with self._lock:
+            now = time.monotonic()
+            stats = {"queued": len(self._queue), "in_flight": self._in_flight}
+            if self.requests is not None:
+                self.requests._refill(now)
+                stats["requests_available"] = round(self.requests.level, 2)
+            if self.tokens is not None:
+                self.tokens._refill(now)
+                stats["tokens_available"] = round(self.tokens.level, 2)
+            return stats
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler configured by RAGMAIL_LLM_* variables (one quota per API key)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(
+                    requests_per_minute=float(os.getenv("RAGMAIL_LLM_RPM", "30")),
+                    tokens_per_minute=float(os.getenv("RAGMAIL_LLM_TPM", "12000")),
+                    max_concurrency=int(os.getenv("RAGMAIL_LLM_MAX_CONCURRENCY", "8")),
+                    max_retries=int(os.getenv("RAGMAIL_LLM_MAX_RETRIES", "5"))
+                )
+    return _scheduler
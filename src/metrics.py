@@ -0,0 +1,210 @@
+"""
+Instrumentation for RAGmail.
+Per-stage timing spans, LLM token counts and cache hit counters, aggregated
+in-process and exported in the Prometheus text format.
+"""
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: List[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: List[str], buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts..., count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, state):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {state[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {state[-2]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for a Prometheus scrape."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, help_text: str, label_names: List[str]) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, label_names: List[str], buckets=STAGE_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, label_names, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ragmail_stage_seconds", "Time spent in each email generation stage", ["stage"]
+)
+LLM_TOKENS = REGISTRY.histogram(
+    "ragmail_llm_tokens", "Tokens per LLM call by prompt and kind (prompt/completion)",
+    ["prompt", "kind"], buckets=TOKEN_BUCKETS
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "ragmail_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+EMAILS = REGISTRY.counter(
+    "ragmail_emails_total", "Generated emails by template type", ["template_type"]
+)
+
+
+class Trace:
+    """Timings, token counts and cache results collected for one email."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cache: Dict[str, Dict[str, int]] = {}
+
+    def report(self) -> Dict:
+        """Metadata-ready summary (timings in milliseconds)."""
+        return {
+            "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.timings.items()},
+            "tokens": dict(self.tokens),
+            "cache": {name: dict(results) for name, results in self.cache.items()}
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("ragmail_trace", default=None)
+
+
+@contextmanager
+def trace():
+    """Collect spans for one email; nested calls share the outer trace."""
+    current = _current_trace.get()
+    if current is not None:
+        yield current
+        return
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a stage into the histogram and the current trace (repeats accumulate)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        current = _current_trace.get()
+        if current is not None:
+            current.timings[stage] = current.timings.get(stage, 0.0) + elapsed
+
+
+def record_tokens(prompt_name: str, usage: Optional[Dict]):
+    """Record an LLM call's usage metadata (input/output token counts)."""
+    if not usage:
+        return
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    LLM_TOKENS.observe(prompt_tokens, prompt=prompt_name, kind="prompt")
+    LLM_TOKENS.observe(completion_tokens, prompt=prompt_name, kind="completion")
+    current = _current_trace.get()
+    if current is not None:
+        current.tokens["prompt"] += prompt_tokens
+        current.tokens["completion"] += completion_tokens
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup."""
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+    current = _current_trace.get()
+    if current is not None:
+        results = current.cache.setdefault(cache, {"hit": 0, "miss": 0})
+        results[result] += 1
+
+
+def record_email(template_type: int):
+    EMAILS.inc(template_type=str(template_type))
+
+
+def in_context(func, *args):
+    """Bind func to the current context so executor threads report into the same trace."""
+    context = contextvars.copy_context()
+    return lambda: context.run(func, *args)
@@ -0,0 +1,338 @@
+"""
+In-process NumPy vector index for RAGmail.
+Brute-force top-k over a memory-mapped float32 matrix; an alternative to Chroma for small corpora.
+Optionally scans int8 or binary codes instead and rescores the best candidates in float32.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+# Rows read at a time when scanning int8 codes or computing norms
+SCAN_ROWS = 8192
+
+# Set bits per byte, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize(matrix: np.ndarray, method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codes and per-vector float32 scales for a float matrix.
+
+    int8: symmetric per-row scale (max |x| / 127), so x ~= scale * code.
+    binary: one sign bit per dimension packed into bytes; the scale is the
+    row's mean |x|, so x ~= scale * (+1/-1 per bit).
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if method == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    elif method == "binary":
+        scales = np.abs(matrix).mean(axis=1)
+        codes = np.packbits(matrix > 0, axis=1)
+    else:
+        raise ValueError(f"Unknown quantization: {method} (use one of {', '.join(QUANTIZATIONS)})")
+    return codes, scales.astype(np.float32)
+
+
+class NumpyVectorIndex:
+    """
+    Embeddings in one contiguous float32 matrix with a parallel metadata array.
+
+    The matrix is memory-mapped read-only when loaded, so opening the index is
+    cheap and its pages can be shared between processes. Writes rebuild the
+    files and re-map them.
+
+    With quantization ("int8" or "binary") searches scan compact in-memory
+    codes (4x / 32x smaller than float32) and only the rescore_factor * k
+    best candidates are read back from the float matrix, so most of its
+    pages are never touched.
+    """
+
+    MATRIX_FILE = "embeddings.npy"
+    DOCUMENTS_FILE = "documents.json"
+    QUANTIZED_FILE = "embeddings.{}.npz"
+
+    def __init__(self, directory: str, quantization: str = "none", rescore_factor: int = 4):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization} (use one of {', '.join(QUANTIZATIONS)})")
+        self.directory = Path(directory)
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.documents: List[Dict] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._masks: Dict[Tuple[str, object], np.ndarray] = {}
+        self._rows: Dict[str, int] = {}
+        self.load()
+
+    def exists(self) -> bool:
+        """Whether the index has been written to disk."""
+        return (self.directory / self.MATRIX_FILE).exists()
+
+    def load(self):
+        """Map the matrix and read the metadata array, if present."""
+        if not self.exists():
+            return
+        with open(self.directory / self.DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
+            self.documents = json.load(f)
+        # Zero-length arrays can't be memory-mapped
+        mmap_mode = "r" if self.documents else None
+        self.matrix = np.load(self.directory / self.MATRIX_FILE, mmap_mode=mmap_mode)
+        self.ids = [doc["id"] for doc in self.documents]
+        self._prepare()
+
+    @property
+    def quantized_path(self) -> Path:
+        return self.directory / self.QUANTIZED_FILE.format(self.quantization)
+
+    def _load_quantized(self) -> bool:
+        """Read the saved codes, scales and norms if they match the matrix."""
+        if not self.quantized_path.exists():
+            return False
+        with np.load(self.quantized_path) as data:
+            if len(data["norms"]) != len(self.documents):
+                return False
+            self._codes, self._scales, self._norms = data["codes"], data["scales"], data["norms"]
+        return True
+
+    def _quantize(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """Codes, scales and norms for a (memory-mapped) matrix, read in slices."""
+        codes, scales, norms = [], [], []
+        for start in range(0, len(matrix), SCAN_ROWS):
+            block = np.asarray(matrix[start:start + SCAN_ROWS], dtype=np.float32)
+            block_codes, block_scales = quantize(block, self.quantization)
+            codes.append(block_codes)
+            scales.append(block_scales)
+            norms.append(np.linalg.norm(block, axis=1).astype(np.float32))
+        norms = np.concatenate(norms)
+        norms[norms == 0] = 1.0
+        return {"codes": np.concatenate(codes), "scales": np.concatenate(scales), "norms": norms}
+
+    def _prepare(self):
+        """Precompute row norms (and codes), the ID -> row map and the per-source boolean masks."""
+        self._masks = {}
+        self._rows = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._codes, self._scales = None, None
+        if len(self.documents) == 0:
+            self._norms = np.zeros(0, dtype=np.float32)
+            return
+        if self.quantization != "none":
+            # Norms come with the codes so the float matrix isn't read at load
+            if not self._load_quantized():
+                # Index written without quantization: quantize in memory (saved on the next write)
+                print(f"Quantizing {len(self.documents)} vectors ({self.quantization}) in memory...")
+                data = self._quantize(self.matrix)
+                self._codes, self._scales, self._norms = data["codes"], data["scales"], data["norms"]
+        else:
+            # In slices: a whole-matrix temporary would be a private copy per worker
+            self._norms = np.concatenate([
+                np.linalg.norm(self.matrix[start:start + SCAN_ROWS], axis=1).astype(np.float32)
+                for start in range(0, len(self.matrix), SCAN_ROWS)
+            ])
+            self._norms[self._norms == 0] = 1.0
+        sources = np.array([doc["metadata"].get("source") for doc in self.documents], dtype=object)
+        for source in set(sources):
+            self._masks[("source", source)] = sources == source
+
+    def _mask(self, filter_dict: Dict) -> np.ndarray:
+        """Boolean row mask for an equality filter (masks are cached per key/value)."""
+        mask = np.ones(len(self.documents), dtype=bool)
+        for key, value in filter_dict.items():
+            cached = self._masks.get((key, value))
+            if cached is None:
+                cached = np.array(
+                    [doc["metadata"].get(key) == value for doc in self.documents], dtype=bool
+                )
+                self._masks[(key, value)] = cached
+            mask &= cached
+        return mask
+
+    def _save(self, documents: List[Dict], matrix: np.ndarray):
+        """Write the matrix, its codes and the metadata atomically, then re-map them."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_matrix = self.directory / (self.MATRIX_FILE + ".tmp")
+        with open(tmp_matrix, 'wb') as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        tmp_docs = self.directory / (self.DOCUMENTS_FILE + ".tmp")
+        with open(tmp_docs, 'w', encoding='utf-8') as f:
+            json.dump(documents, f, ensure_ascii=False)
+        tmp_codes = None
+        if self.quantization != "none" and len(documents):
+            tmp_codes = self.directory / (self.quantized_path.name + ".tmp")
+            with open(tmp_codes, 'wb') as f:
+                np.savez(f, **self._quantize(matrix))
+        # Codes of other quantizations no longer match the matrix
+        for method in QUANTIZATIONS[1:]:
+            path = self.directory / self.QUANTIZED_FILE.format(method)
+            if path.exists() and method != self.quantization:
+                path.unlink()
+        os.replace(tmp_matrix, self.directory / self.MATRIX_FILE)
+        os.replace(tmp_docs, self.directory / self.DOCUMENTS_FILE)
+        if tmp_codes is not None:
+            os.replace(tmp_codes, self.quantized_path)
+        self.load()
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[Document]):
+        """Insert or replace documents with precomputed embeddings."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        replace = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in replace]
+
+        new_docs = [self.documents[i] for i in keep] + [
+            {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in zip(ids, documents)
+        ]
+        if len(keep):
+            matrix = np.vstack([np.asarray(self.matrix[keep]), embeddings])
+        else:
+            matrix = embeddings
+        self._save(new_docs, matrix)
+
+    def delete(self, ids: List[str]):
+        """Delete documents by ID."""
+        remove = set(ids)
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in remove]
+        if len(keep) == len(self.ids):
+            return
+        self._save(
+            [self.documents[i] for i in keep],
+            np.asarray(self.matrix[keep]) if keep else np.zeros((0, self.matrix.shape[1]), dtype=np.float32)
+        )
+
+    def delete_collection(self):
+        """Remove every document from the index."""
+        for name in (self.MATRIX_FILE, self.DOCUMENTS_FILE, *(
+            self.QUANTIZED_FILE.format(method) for method in QUANTIZATIONS[1:]
+        )):
+            path = self.directory / name
+            if path.exists():
+                path.unlink()
+        self.ids, self.documents = [], []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._prepare()
+
+    def get_documents(self, filter: Optional[Dict] = None) -> List[Document]:
+        """All documents, optionally restricted by an equality filter."""
+        rows = range(len(self.documents))
+        if filter:
+            rows = np.flatnonzero(self._mask(filter))
+        return [
+            Document(
+                page_content=self.documents[i]["page_content"],
+                metadata=self.documents[i]["metadata"]
+            )
+            for i in rows
+        ]
+
+    def _exact_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the float32 rows to the query."""
+        if len(rows) == len(self.documents):
+            return (self.matrix @ query) / (self._norms * (np.linalg.norm(query) or 1.0))
+        return (self.matrix[rows] @ query) / (self._norms[rows] * (np.linalg.norm(query) or 1.0))
+
+    def _approximate_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity from the codes (the ranking is what matters)."""
+        full = len(rows) == len(self.documents)
+        codes = self._codes if full else self._codes[rows]
+        scales = self._scales if full else self._scales[rows]
+        norms = self._norms if full else self._norms[rows]
+
+        if self.quantization == "int8":
+            # Code slices are widened to float32 one at a time to bound the temporary
+            dots = np.concatenate([
+                codes[start:start + SCAN_ROWS].astype(np.float32) @ query
+                for start in range(0, len(codes), SCAN_ROWS)
+            ]) if len(codes) else np.zeros(0, dtype=np.float32)
+        else:
+            # Agreeing signs minus disagreeing ones: dimensions - 2 * Hamming distance
+            query_bits = np.packbits(query > 0)
+            differing = codes ^ query_bits
+            if hasattr(np, "bitwise_count"):
+                hamming = np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+            else:
+                hamming = _POPCOUNT[differing].sum(axis=1, dtype=np.int32)
+            dots = (len(query) - 2 * hamming).astype(np.float32) * float(np.abs(query).mean())
+        return dots * scales / norms
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[Document]:
+        """
+        Top-k cosine similarity via one matrix-vector product and argpartition.
+
+        With ids, only those rows are scored (a pre-filtered candidate set).
+        A quantized index ranks by the codes first and rescores the best
+        rescore_factor * k rows against the float32 matrix.
+        """
+        if len(self.documents) == 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if ids is not None:
+            rows = np.array(sorted({self._rows[i] for i in ids if i in self._rows}), dtype=np.int64)
+        else:
+            rows = np.arange(len(self.documents))
+        if self.quantization != "none":
+            scores = self._approximate_scores(query, rows)
+        else:
+            scores = self._exact_scores(query, rows)
+
+        candidates = len(scores)
+        if filter:
+            mask = self._mask(filter)[rows]
+            candidates = int(mask.sum())
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, candidates)
+        if k <= 0:
+            return []
+        if self.quantization != "none":
+            pool_size = min(k * self.rescore_factor, candidates)
+            pool = np.argpartition(-scores, pool_size - 1)[:pool_size]
+            rows = rows[pool]
+            scores = self._exact_scores(query, rows)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = rows[top[np.argsort(-scores[top])]]
+
+        return [
+            Document(
+                page_content=self.documents[i]["page_content"],
+                metadata=self.documents[i]["metadata"]
+            )
+            for i in top
+        ]
+
+    def footprint(self) -> Dict[str, int]:
+        """
+        Bytes used by the index: on disk, and scanned by every search (codes,
+        scales and norms; the whole float matrix when not quantized).
+        """
+        dims = self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+        float_bytes = len(self.documents) * dims * 4
+        if self.quantization != "none" and self._codes is not None:
+            scanned = self._codes.nbytes + self._scales.nbytes + self._norms.nbytes
+        else:
+            scanned = float_bytes + self._norms.nbytes
+        disk = sum(path.stat().st_size for path in self.directory.glob("*") if path.is_file()) \
+            if self.directory.exists() else 0
+        return {
+            "vectors": len(self.documents),
+            "dimensions": dims,
+            "float32_bytes": float_bytes,
+            "search_memory_bytes": scanned,
+            "disk_bytes": disk
+        }
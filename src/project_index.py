@@ -0,0 +1,70 @@
+"""
+Direct project lookup for RAGmail.
+Indexes projects by ID and normalized title so a forced project is fetched without retrieval.
+"""
+
+import re
+import difflib
+from typing import List, Optional, Dict
+from langchain_core.documents import Document
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase and reduce punctuation/whitespace runs to single spaces."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", title.lower()).split())
+
+
+class ProjectIndex:
+    """In-memory project lookup by ID and by normalized title."""
+
+    def __init__(self, documents: List[Document]):
+        self.by_id: Dict[str, Document] = {}
+        self.by_title: Dict[str, Document] = {}
+        for doc in documents:
+            self.by_id[doc.metadata["project_id"]] = doc
+            self.by_title[normalize_title(doc.metadata["title"])] = doc
+
+    @classmethod
+    def from_loader(cls, loader) -> "ProjectIndex":
+        """Build from projects.json."""
+        return cls(loader.load_projects())
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "ProjectIndex":
+        """Build from the project metadata stored in the vector index."""
+        return cls(vector_store.get_documents({"source": "projects"}))
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def ids(self) -> List[str]:
+        """All project IDs."""
+        return sorted(self.by_id)
+
+    def get(self, key: str, fuzzy: bool = False, cutoff: float = 0.75) -> Optional[Document]:
+        """
+        Look up a project by ID or title.
+
+        Exact ID and normalized-title matches are tried first. With fuzzy=True,
+        the closest title or ID scoring at least cutoff is returned instead of None.
+        """
+        doc = self.by_id.get(key)
+        if doc is not None:
+            return doc
+
+        normalized = normalize_title(key)
+        doc = self.by_title.get(normalized)
+        if doc is not None:
+            return doc
+        for project_id, candidate in self.by_id.items():
+            if normalize_title(project_id) == normalized:
+                return candidate
+
+        if fuzzy:
+            names = dict(self.by_title)
+            names.update({normalize_title(pid): d for pid, d in self.by_id.items()})
+            matches = difflib.get_close_matches(normalized, list(names), n=1, cutoff=cutoff)
+            if matches:
+                return names[matches[0]]
+
+        return None
@@ -3,34 +3,279 @@ RAG Chain for professor-project matching using LangChain and Groq.
 """
 
 import os
-from typing import List, Dict, Optional
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, AsyncIterator
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
 from src.vector_store import RAGmailVectorStore
+from src.llm_cache import LLMResponseCache, make_cache_key
+from src.reranker import CrossEncoderReranker, calibrate_score, DEFAULT_RERANKER_MODEL
+from src.llm_provider import create_llm
+from src.llm_scheduler import LLMScheduler, get_scheduler
+from src import metrics
 
 load_dotenv()
 
 
+SELECTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at matching student projects with professor research interests.
+Your task is to analyze the professor's research area and select the MOST RELEVANT project from the student's portfolio.
+
+Consider:
+- Technical alignment (technologies, methods, domains)
+- Research area overlap
+- Demonstrated skills relevant to the professor's work
+- Impact and sophistication of the project
+
+Respond in JSON format with:
+{{
+    "selected_project_number": <number of the selected project>,
+    "project_title": "<title>",
+    "alignment_explanation": "<2-3 sentences explaining why this project aligns with the professor's research>",
+    "key_technologies": ["tech1", "tech2", ...],
+    "relevance_score": <1-10>
+}}
+"""),
+    ("user", """Professor's Research Area: {research_area}
+{paper_info}
+
+Available Projects:
+{projects}
+
+Select the best matching project and explain the alignment.""")
+])
+
+PARAGRAPH_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are writing a compelling paragraph for a graduate school application email.
+The paragraph should:
+1. Reference the professor's research or paper naturally
+2. Describe the student's relevant project in 2-3 sentences
+3. Highlight the technical alignment and demonstrated skills
+4. Be professional, specific, and show genuine interest
+5. Use active voice and concrete details
+
+Keep it concise (3-4 sentences max) and authentic."""),
+    ("user", """Professor: Dr. {professor_name}
+Professor's Research: {research_area}
+{paper_info}
+
+Student's Selected Project:
+Title: {project_title}
+{project_details}
+
+Alignment Reasoning: {alignment_explanation}
+
+Write a compelling paragraph connecting this project to the professor's work.""")
+])
+
+FUSED_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at matching student projects with professor research interests and at writing graduate school application emails.
+First, select the MOST RELEVANT project from the student's portfolio for the professor's research, considering:
+- Technical alignment (technologies, methods, domains)
+- Research area overlap
+- Demonstrated skills relevant to the professor's work
+- Impact and sophistication of the project
+
+Then write a compelling paragraph for the email that:
+1. References the professor's research or paper naturally
+2. Describes the selected project in 2-3 sentences
+3. Highlights the technical alignment and demonstrated skills
+4. Is professional, specific, and shows genuine interest
+5. Uses active voice and concrete details
+Keep the paragraph concise (3-4 sentences max) and authentic.
+
+Respond with a single JSON object:
+{{
+    "selected_project_number": <number of the selected project>,
+    "project_title": "<title>",
+    "alignment_explanation": "<2-3 sentences explaining why this project aligns with the professor's research>",
+    "key_technologies": ["tech1", "tech2", ...],
+    "relevance_score": <1-10>,
+    "paragraph": "<the email paragraph>"
+}}
+"""),
+    ("user", """Professor: Dr. {professor_name}
+Professor's Research Area: {research_area}
+{paper_info}
+
+Available Projects:
+{projects}
+
+Select the best matching project and write the paragraph connecting it to the professor's work.""")
+])
+
+PROMPTS = {
+    "selection": SELECTION_PROMPT,
+    "paragraph": PARAGRAPH_PROMPT,
+    "fused": FUSED_PROMPT,
+}
+
+# Bump a version whenever its prompt text changes so cached responses are not reused
+PROMPT_VERSIONS = {
+    "selection": 3,
+    "paragraph": 2,
+    "fused": 3,
+}
+
+# Expected completion length per prompt, reserved against the tokens-per-minute budget
+COMPLETION_TOKEN_ESTIMATES = {
+    "selection": 200,
+    "paragraph": 250,
+    "fused": 450,
+}
+
+
+def response_cache_from_env() -> Optional[LLMResponseCache]:
+    """Build the LLM response cache configured by RAGMAIL_LLM_CACHE* variables."""
+    if os.getenv("RAGMAIL_LLM_CACHE", "false").lower() not in ("1", "true", "yes"):
+        return None
+    threshold = os.getenv("RAGMAIL_LLM_CACHE_SIMILARITY")
+    return LLMResponseCache(
+        path=os.getenv("RAGMAIL_LLM_CACHE_PATH", "llm_cache/responses.sqlite"),
+        ttl_seconds=float(os.getenv("RAGMAIL_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        max_entries=int(os.getenv("RAGMAIL_LLM_CACHE_MAX_ENTRIES", "5000")),
+        similarity_threshold=float(threshold) if threshold else None
+    )
+
+
+def reranker_from_env() -> Optional[CrossEncoderReranker]:
+    """Build the cross-encoder re-ranker configured by RAGMAIL_RERANKER* variables."""
+    if os.getenv("RAGMAIL_RERANKER", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return CrossEncoderReranker(
+        model_name=os.getenv("RAGMAIL_RERANKER_MODEL", DEFAULT_RERANKER_MODEL),
+        batch_size=int(os.getenv("RAGMAIL_RERANKER_BATCH_SIZE", "16")),
+        margin=float(os.getenv("RAGMAIL_RERANKER_MARGIN", "2.0"))
+    )
+
+
+# Embedding + Chroma queries are CPU-bound and synchronous; async callers
+# run them on this bounded pool so they never block the event loop.
+_embedding_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_embedding_executor() -> ThreadPoolExecutor:
+    """Return the shared executor used for embedding/retrieval work."""
+    global _embedding_executor
+    if _embedding_executor is None:
+        _embedding_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("RAGMAIL_EMBED_WORKERS", "2")),
+            thread_name_prefix="ragmail-embed"
+        )
+    return _embedding_executor
+
+
 class ProfessorProjectMatcher:
     """Match professor research with relevant projects using RAG."""
     
-    def __init__(self):
-        self.llm = ChatGroq(
-            temperature=0.7,
-            model_name=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
-            api_key=os.getenv("GROQ_API_KEY")
-        )
-        self.vector_store = RAGmailVectorStore()
+    def __init__(
+        self,
+        fused: Optional[bool] = None,
+        response_cache: Optional[LLMResponseCache] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        llm=None,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        # Fused mode selects the project and writes the paragraph in one LLM call
+        if fused is None:
+            fused = os.getenv("RAGMAIL_FUSED_PIPELINE", "false").lower() in ("1", "true", "yes")
+        self.fused = fused
+        self.response_cache = response_cache if response_cache is not None else response_cache_from_env()
+        # Optional local re-ranking; a confident top match skips LLM selection
+        self.reranker = reranker if reranker is not None else reranker_from_env()
+        
+        # Provider comes from RAGMAIL_LLM_PROVIDER unless a model is passed in
+        self.llm = llm if llm is not None else create_llm(temperature=0.7)
+        # Every LLM call waits for rate-limit budget and is retried through this
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.vector_store = RAGmailVectorStore(read_only=True)
         
-        # Try to load existing vector store
+        # Check the vector store exists; the client and model load on first use
         try:
-            self.vector_store.load_vectorstore()
+            self.vector_store.load_vectorstore(lazy=True)
         except FileNotFoundError:
             print("Vector store not found. Please run initialize_vector_db first.")
             raise
     
+    def warm_up(self):
+        """Load the embedding model and open the index ahead of the first request."""
+        self.vector_store.warm_up()
+        if self.reranker is not None:
+            self.reranker.model
+    
+    def _cache_keys(self, prompt_name: str, inputs: Dict):
+        """Exact key and near-duplicate group key (all inputs but the research area)."""
+        model = getattr(self.llm, "model_name", type(self.llm).__name__)
+        temperature = getattr(self.llm, "temperature", None)
+        version = PROMPT_VERSIONS[prompt_name]
+        other_inputs = {k: v for k, v in inputs.items() if k != "research_area"}
+        return (
+            make_cache_key(prompt_name, version, model, temperature, inputs),
+            make_cache_key(prompt_name, version, model, temperature, other_inputs)
+        )
+    
+    def _research_embedding(self, research_area: str) -> Optional[List[float]]:
+        """Research-area embedding for near-duplicate cache lookup, if enabled."""
+        if self.response_cache is None or self.response_cache.similarity_threshold is None:
+            return None
+        return self.vector_store.embed_query(research_area)
+    
+    def _invoke(self, prompt_name: str, inputs: Dict, llm=None) -> str:
+        """Run a prompt through the LLM (or the response cache) and return the text."""
+        chain = PROMPTS[prompt_name] | (llm or self.llm)
+        with metrics.span(f"llm_{prompt_name}"):
+            tokens = self._estimate_tokens(prompt_name, inputs)
+            if self.response_cache is None:
+                return self._content(prompt_name, self.scheduler.run(lambda: chain.invoke(inputs), tokens))
+            
+            key, group_key = self._cache_keys(prompt_name, inputs)
+            embedding = self._research_embedding(inputs["research_area"])
+            content = self.response_cache.get(key, group_key, embedding)
+            metrics.record_cache("llm", content is not None)
+            if content is None:
+                content = self._content(prompt_name, self.scheduler.run(lambda: chain.invoke(inputs), tokens))
+                self.response_cache.put(key, content, group_key, embedding)
+            return content
+    
+    async def _ainvoke(self, prompt_name: str, inputs: Dict, llm=None) -> str:
+        """Async variant of _invoke."""
+        chain = PROMPTS[prompt_name] | (llm or self.llm)
+        with metrics.span(f"llm_{prompt_name}"):
+            tokens = self._estimate_tokens(prompt_name, inputs)
+            if self.response_cache is None:
+                return self._content(prompt_name, await self.scheduler.arun(lambda: chain.ainvoke(inputs), tokens))
+            
+            key, group_key = self._cache_keys(prompt_name, inputs)
+            embedding = None
+            if self.response_cache.similarity_threshold is not None:
+                loop = asyncio.get_running_loop()
+                embedding = await loop.run_in_executor(
+                    get_embedding_executor(),
+                    metrics.in_context(self._research_embedding, inputs["research_area"])
+                )
+            # The cache is SQLite (plus a similarity scan); keep it off the event loop
+            content = await asyncio.to_thread(self.response_cache.get, key, group_key, embedding)
+            metrics.record_cache("llm", content is not None)
+            if content is None:
+                content = self._content(prompt_name, await self.scheduler.arun(lambda: chain.ainvoke(inputs), tokens))
+                await asyncio.to_thread(self.response_cache.put, key, content, group_key, embedding)
+            return content
+    
+    @staticmethod
+    def _estimate_tokens(prompt_name: str, inputs: Dict) -> int:
+        """Prompt size (~4 characters per token) plus the expected completion."""
+        prompt = PROMPTS[prompt_name].format(**inputs)
+        return len(prompt) // 4 + COMPLETION_TOKEN_ESTIMATES[prompt_name]
+    
+    @staticmethod
+    def _content(prompt_name: str, message) -> str:
+        """Record the call's token usage and return its text."""
+        metrics.record_tokens(prompt_name, getattr(message, "usage_metadata", None))
+        return message.content
+    
     def find_matching_projects(
         self, 
         professor_research: str, 
@@ -45,134 +290,302 @@ class ProfessorProjectMatcher:
             query = f"{professor_research}. Recent paper: {paper_title}"
         
         # Search for matching projects
-        matching_projects = self.vector_store.search_projects_only(query, k=k)
+        with metrics.span("retrieval"):
+            matching_projects = self.vector_store.search_projects_only(query, k=k)
         
         return matching_projects
     
-    def select_best_project(
+    async def afind_matching_projects(
         self,
         professor_research: str,
         paper_title: Optional[str] = None,
-        paper_summary: Optional[str] = None,
-        matching_projects: Optional[List[Document]] = None
+        k: int = 3
+    ) -> List[Document]:
+        """Async variant of find_matching_projects (runs on the embedding executor)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_embedding_executor(),
+            metrics.in_context(self.find_matching_projects, professor_research, paper_title, k)
+        )
+    
+    def _selection_inputs(
+        self,
+        professor_research: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        matching_projects: List[Document]
     ) -> Dict:
-        """Use LLM to select and explain the best matching project."""
-        
-        if matching_projects is None:
-            matching_projects = self.find_matching_projects(professor_research, paper_title)
-        
-        # Prepare context
+        """Build the input variables for SELECTION_PROMPT."""
+        # Compact per-project summaries precomputed by the loader
         projects_context = "\n\n".join([
-            f"PROJECT {i+1}:\n{doc.page_content}\n"
+            f"PROJECT {i+1}:\n{self._selection_summary(doc)}\n"
             for i, doc in enumerate(matching_projects)
         ])
         
-        # Create prompt
-        selection_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an expert at matching student projects with professor research interests.
-Your task is to analyze the professor's research area and select the MOST RELEVANT project from the student's portfolio.
-
-Consider:
-- Technical alignment (technologies, methods, domains)
-- Research area overlap
-- Demonstrated skills relevant to the professor's work
-- Impact and sophistication of the project
-
-Respond in JSON format with:
-{{
-    "selected_project_number": <1, 2, or 3>,
-    "project_title": "<title>",
-    "alignment_explanation": "<2-3 sentences explaining why this project aligns with the professor's research>",
-    "key_technologies": ["tech1", "tech2", ...],
-    "relevance_score": <1-10>
-}}
-"""),
-            ("user", """Professor's Research Area: {research_area}
-{paper_info}
-
-Available Projects:
-{projects}
-
-Select the best matching project and explain the alignment.""")
-        ])
-        
         paper_info = ""
         if paper_title:
             paper_info = f"Recent Paper: {paper_title}"
             if paper_summary:
                 paper_info += f"\nPaper Summary: {paper_summary}"
         
-        chain = selection_prompt | self.llm
-        
-        response = chain.invoke({
+        return {
             "research_area": professor_research,
             "paper_info": paper_info,
             "projects": projects_context
-        })
-        
-        # Parse response (handle both JSON and text)
+        }
+    
+    @staticmethod
+    def _selection_summary(doc: Document) -> str:
+        """Precomputed selection summary; full text for indexes built before it existed."""
+        return doc.metadata.get("selection_summary") or doc.page_content.strip()
+    
+    @staticmethod
+    def _paragraph_context(doc: Document) -> str:
+        """Precomputed paragraph context; a slice of the full text for older indexes."""
+        return doc.metadata.get("paragraph_context") or doc.page_content.strip()[:800]
+    
+    def _parse_selection(self, content: str, matching_projects: List[Document]) -> Dict:
+        """Parse the selection response (handle both JSON and text)."""
         try:
-            import json
-            result = json.loads(response.content)
+            result = json.loads(content)
         except:
             # Fallback: extract information from text response
             selected_idx = 0
             result = {
                 "selected_project_number": 1,
                 "project_title": matching_projects[selected_idx].metadata['title'],
-                "alignment_explanation": response.content,
+                "alignment_explanation": content,
                 "key_technologies": matching_projects[selected_idx].metadata.get('domains', []),
                 "relevance_score": 8
             }
         
-        # Add full project document
-        selected_idx = result.get("selected_project_number", 1) - 1
+        # Add full project document; an out-of-range number falls back to the top-ranked project
+        selected_idx = self._selected_index(result, matching_projects)
+        if selected_idx is None:
+            selected_idx = 0
+            result["selected_project_number"] = 1
+            result["project_title"] = matching_projects[0].metadata['title']
         result["project_document"] = matching_projects[selected_idx]
         
         return result
     
-    def generate_project_paragraph(
+    @staticmethod
+    def _selected_index(result: Dict, matching_projects: List[Document]) -> Optional[int]:
+        """0-based index of the LLM's selected_project_number; None unless it is in 1..len(matching_projects)."""
+        try:
+            number = int(result.get("selected_project_number", 1))
+        except (TypeError, ValueError):
+            return None
+        if not 1 <= number <= len(matching_projects):
+            return None
+        return number - 1
+    
+    def _rerank(
+        self,
+        professor_research: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        matching_projects: List[Document]
+    ):
+        """
+        Re-order candidates with the cross-encoder.
+        
+        Returns (re-ordered projects, selection dict or None). The selection is
+        only set when the top project clearly beats the runner-up.
+        """
+        if self.reranker is None or not matching_projects:
+            return matching_projects, None
+        
+        query = " ".join(part for part in (professor_research, paper_title, paper_summary) if part)
+        with metrics.span("rerank"):
+            ranked = self.reranker.rerank(query, matching_projects)
+        projects = [doc for doc, _ in ranked]
+        if not self.reranker.is_confident(ranked):
+            return projects, None
+        
+        top_doc, top_score = ranked[0]
+        return projects, {
+            "selected_project_number": 1,
+            "project_title": top_doc.metadata['title'],
+            "alignment_explanation": (
+                f"Of the student's projects, {top_doc.metadata['title']} is by far the closest "
+                f"match to the professor's work on {professor_research}."
+            ),
+            "key_technologies": top_doc.metadata.get('domains', []),
+            "relevance_score": calibrate_score(top_score),
+            "selection_method": "reranker",
+            "project_document": top_doc
+        }
+    
+    async def _arerank(
+        self,
+        professor_research: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        matching_projects: List[Document]
+    ):
+        """Async variant of _rerank (scoring runs on the embedding executor)."""
+        if self.reranker is None or not matching_projects:
+            return matching_projects, None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_embedding_executor(),
+            metrics.in_context(self._rerank, professor_research, paper_title, paper_summary, matching_projects)
+        )
+    
+    def select_best_project(
+        self,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        matching_projects: Optional[List[Document]] = None
+    ) -> Dict:
+        """Use LLM to select and explain the best matching project."""
+        
+        if matching_projects is None:
+            matching_projects = self.find_matching_projects(professor_research, paper_title)
+        
+        matching_projects, confident = self._rerank(
+            professor_research, paper_title, paper_summary, matching_projects
+        )
+        if confident is not None:
+            return confident
+        
+        content = self._invoke("selection", self._selection_inputs(
+            professor_research, paper_title, paper_summary, matching_projects
+        ))
+        
+        return self._parse_selection(content, matching_projects)
+    
+    async def aselect_best_project(
+        self,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        matching_projects: Optional[List[Document]] = None
+    ) -> Dict:
+        """Async variant of select_best_project."""
+        
+        if matching_projects is None:
+            matching_projects = await self.afind_matching_projects(professor_research, paper_title)
+        
+        matching_projects, confident = await self._arerank(
+            professor_research, paper_title, paper_summary, matching_projects
+        )
+        if confident is not None:
+            return confident
+        
+        content = await self._ainvoke("selection", self._selection_inputs(
+            professor_research, paper_title, paper_summary, matching_projects
+        ))
+        
+        return self._parse_selection(content, matching_projects)
+    
+    def _parse_fused(self, content: str, matching_projects: List[Document]) -> Optional[Dict]:
+        """Parse a fused response; None if it is malformed, has no paragraph or selects no listed project."""
+        try:
+            result = json.loads(content)
+            paragraph = result.pop("paragraph").strip()
+            selected_idx = self._selected_index(result, matching_projects)
+        except:
+            return None
+        if selected_idx is None:
+            return None
+        project_doc = matching_projects[selected_idx]
+        
+        result["project_document"] = project_doc
+        result.setdefault("project_title", project_doc.metadata['title'])
+        result["project_paragraph"] = paragraph
+        return result
+    
+    def select_and_write_paragraph(
         self,
         professor_name: str,
         professor_research: str,
         paper_title: Optional[str] = None,
         paper_summary: Optional[str] = None,
-        selected_project: Optional[Dict] = None
-    ) -> str:
-        """Generate the project alignment paragraph for email."""
+        matching_projects: Optional[List[Document]] = None
+    ) -> Dict:
+        """
+        Select the best project and write its paragraph in a single LLM call.
         
-        if selected_project is None:
+        Returns the select_best_project dict plus 'project_paragraph'. Falls back
+        to the two-call pipeline when the fused response is malformed.
+        """
+        if matching_projects is None:
             matching_projects = self.find_matching_projects(professor_research, paper_title)
-            selected_project = self.select_best_project(
-                professor_research, paper_title, paper_summary, matching_projects
+        
+        matching_projects, confident = self._rerank(
+            professor_research, paper_title, paper_summary, matching_projects
+        )
+        if confident is not None:
+            # Selection is settled locally; only the paragraph needs the LLM
+            confident["project_paragraph"] = self.generate_project_paragraph(
+                professor_name, professor_research, paper_title, paper_summary, confident
             )
+            return confident
         
-        project_doc = selected_project["project_document"]
-        project_title = selected_project["project_title"]
+        inputs = self._selection_inputs(professor_research, paper_title, paper_summary, matching_projects)
+        inputs["professor_name"] = professor_name
         
-        # Create paragraph generation prompt
-        paragraph_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are writing a compelling paragraph for a graduate school application email.
-The paragraph should:
-1. Reference the professor's research or paper naturally
-2. Describe the student's relevant project in 2-3 sentences
-3. Highlight the technical alignment and demonstrated skills
-4. Be professional, specific, and show genuine interest
-5. Use active voice and concrete details
-
-Keep it concise (3-4 sentences max) and authentic."""),
-            ("user", """Professor: Dr. {professor_name}
-Professor's Research: {research_area}
-{paper_info}
-
-Student's Selected Project:
-Title: {project_title}
-{project_details}
-
-Alignment Reasoning: {alignment_explanation}
-
-Write a compelling paragraph connecting this project to the professor's work.""")
-        ])
+        content = self._invoke(
+            "fused", inputs, llm=self.llm.bind(response_format={"type": "json_object"})
+        )
+        
+        result = self._parse_fused(content, matching_projects)
+        if result is None:
+            result = self._parse_selection(content, matching_projects)
+            result["project_paragraph"] = self.generate_project_paragraph(
+                professor_name, professor_research, paper_title, paper_summary, result
+            )
+        return result
+    
+    async def aselect_and_write_paragraph(
+        self,
+        professor_name: str,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        matching_projects: Optional[List[Document]] = None
+    ) -> Dict:
+        """Async variant of select_and_write_paragraph."""
+        if matching_projects is None:
+            matching_projects = await self.afind_matching_projects(professor_research, paper_title)
+        
+        matching_projects, confident = await self._arerank(
+            professor_research, paper_title, paper_summary, matching_projects
+        )
+        if confident is not None:
+            confident["project_paragraph"] = await self.agenerate_project_paragraph(
+                professor_name, professor_research, paper_title, paper_summary, confident
+            )
+            return confident
+        
+        inputs = self._selection_inputs(professor_research, paper_title, paper_summary, matching_projects)
+        inputs["professor_name"] = professor_name
+        
+        content = await self._ainvoke(
+            "fused", inputs, llm=self.llm.bind(response_format={"type": "json_object"})
+        )
+        
+        result = self._parse_fused(content, matching_projects)
+        if result is None:
+            result = self._parse_selection(content, matching_projects)
+            result["project_paragraph"] = await self.agenerate_project_paragraph(
+                professor_name, professor_research, paper_title, paper_summary, result
+            )
+        return result
+    
+    def _paragraph_inputs(
+        self,
+        professor_name: str,
+        professor_research: str,
+        paper_title: Optional[str],
+        paper_summary: Optional[str],
+        selected_project: Dict
+    ) -> Dict:
+        """Build the input variables for PARAGRAPH_PROMPT."""
+        project_doc = selected_project["project_document"]
         
         paper_info = ""
         if paper_title:
@@ -180,19 +593,111 @@ Write a compelling paragraph connecting this project to the professor's work."""
             if paper_summary:
                 paper_info += f"\n{paper_summary}"
         
-        chain = paragraph_prompt | self.llm
-        
-        response = chain.invoke({
+        return {
             "professor_name": professor_name,
             "research_area": professor_research,
             "paper_info": paper_info,
-            "project_title": project_title,
-            "project_details": project_doc.page_content[:800],  # Truncate for context
+            "project_title": selected_project["project_title"],
+            "project_details": self._paragraph_context(project_doc),
             "alignment_explanation": selected_project["alignment_explanation"]
-        })
+        }
+    
+    def generate_project_paragraph(
+        self,
+        professor_name: str,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        selected_project: Optional[Dict] = None
+    ) -> str:
+        """Generate the project alignment paragraph for email."""
+        
+        if selected_project is None:
+            matching_projects = self.find_matching_projects(professor_research, paper_title)
+            selected_project = self.select_best_project(
+                professor_research, paper_title, paper_summary, matching_projects
+            )
+        
+        content = self._invoke("paragraph", self._paragraph_inputs(
+            professor_name, professor_research, paper_title, paper_summary, selected_project
+        ))
+        
+        return content.strip()
+    
+    async def agenerate_project_paragraph(
+        self,
+        professor_name: str,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        selected_project: Optional[Dict] = None
+    ) -> str:
+        """Async variant of generate_project_paragraph."""
         
-        return response.content.strip()
+        if selected_project is None:
+            matching_projects = await self.afind_matching_projects(professor_research, paper_title)
+            selected_project = await self.aselect_best_project(
+                professor_research, paper_title, paper_summary, matching_projects
+            )
+        
+        content = await self._ainvoke("paragraph", self._paragraph_inputs(
+            professor_name, professor_research, paper_title, paper_summary, selected_project
+        ))
+        
+        return content.strip()
 
+    
+    async def astream_project_paragraph(
+        self,
+        professor_name: str,
+        professor_research: str,
+        paper_title: Optional[str] = None,
+        paper_summary: Optional[str] = None,
+        selected_project: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """Stream the project paragraph token by token (a cached paragraph is yielded whole)."""
+        
+        if selected_project is None:
+            selected_project = await self.aselect_best_project(
+                professor_research, paper_title, paper_summary
+            )
+        
+        inputs = self._paragraph_inputs(
+            professor_name, professor_research, paper_title, paper_summary, selected_project
+        )
+        
+        key = group_key = embedding = None
+        if self.response_cache is not None:
+            key, group_key = self._cache_keys("paragraph", inputs)
+            if self.response_cache.similarity_threshold is not None:
+                loop = asyncio.get_running_loop()
+                embedding = await loop.run_in_executor(
+                    get_embedding_executor(),
+                    metrics.in_context(self._research_embedding, professor_research)
+                )
+            cached = await asyncio.to_thread(self.response_cache.get, key, group_key, embedding)
+            metrics.record_cache("llm", cached is not None)
+            if cached is not None:
+                yield cached.strip()
+                return
+        
+        chain = PARAGRAPH_PROMPT | self.llm
+        parts = []
+        usage = {}
+        # Wall time of the stream, including time the consumer spends between chunks
+        with metrics.span("llm_paragraph"):
+            tokens = self._estimate_tokens("paragraph", inputs)
+            async for chunk in self.scheduler.astream(lambda: chain.astream(inputs), tokens):
+                for name, count in (getattr(chunk, "usage_metadata", None) or {}).items():
+                    if isinstance(count, int):
+                        usage[name] = usage.get(name, 0) + count
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+        metrics.record_tokens("paragraph", usage)
+        
+        if self.response_cache is not None:
+            await asyncio.to_thread(self.response_cache.put, key, "".join(parts), group_key, embedding)
 
 if __name__ == "__main__":
     # Test the matcher
@@ -0,0 +1,72 @@
+"""
+Cross-encoder re-ranking for RAGmail.
+Scores (research query, project) pairs locally so clear-cut matches skip the LLM selection call.
+"""
+
+import math
+import threading
+from typing import List, Tuple, Dict
+from langchain_core.documents import Document
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Loaded models are shared by every reranker in the process
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def load_cross_encoder(model_name: str):
+    """Load (once per process) and return a CPU CrossEncoder."""
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is None:
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder(model_name, device="cpu")
+                _models[model_name] = model
+    return model
+
+
+def calibrate_score(logit: float) -> int:
+    """Map a cross-encoder logit onto the 1-10 relevance scale used by selection."""
+    return max(1, min(10, round(1 + 9 / (1 + math.exp(-logit)))))
+
+
+class CrossEncoderReranker:
+    """Re-rank retrieved projects and decide when the top one is a clear winner."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANKER_MODEL,
+        batch_size: int = 16,
+        margin: float = 2.0
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        # Minimum logit gap between first and second place to skip LLM selection
+        self.margin = margin
+
+    @property
+    def model(self):
+        return load_cross_encoder(self.model_name)
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Tuple[Document, float]]:
+        """Score every document against the query in batches; best first."""
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, doc.page_content) for doc in documents],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+        ranked = sorted(zip(documents, [float(s) for s in scores]), key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def is_confident(self, ranked: List[Tuple[Document, float]]) -> bool:
+        """True when the top score beats the runner-up by at least the margin."""
+        if not ranked:
+            return False
+        if len(ranked) == 1:
+            return True
+        return ranked[0][1] - ranked[1][1] >= self.margin
@@ -0,0 +1,163 @@
+"""
+Research-tag index for RAGmail.
+Normalizes each project's domains and research keywords into a shared tag
+vocabulary with one bitset (a Python int) per project, so queries can be
+matched against projects with a few integer ANDs before any vector scoring.
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:[+#]+)?")
+
+# Metadata fields (comma-joined by the loader) and the weight of a match on each
+TAG_FIELDS = {"domains": 2, "keywords": 1}
+
+
+def _singular(word: str) -> str:
+    """Crude plural folding so "agents" matches "agent" ("systems" -> "system")."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_words(text: str) -> List[str]:
+    """Lowercase words with punctuation and plurals folded ("Multi-Agent Systems" -> multi, agent, system)."""
+    return [_singular(word) for word in WORD_RE.findall(text.lower())]
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(normalize_words(tag))
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+class TagIndex:
+    """
+    Tag vocabulary and per-project bitsets, persisted as JSON next to the vector index.
+
+    Bit i of a project's bitset is set when the project carries tag i. A query
+    is tagged by scanning its words for known tag phrases, and projects are
+    scored by the weighted number of shared tags (domain matches count double).
+    """
+
+    FILE_NAME = "tag_index.json"
+
+    def __init__(self):
+        self.tags: List[str] = []
+        self.domain_mask = 0
+        self.doc_ids: List[str] = []
+        self.bitsets: List[int] = []
+        self._bits: Dict[str, int] = {}
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+
+    def build(self, documents: List[Document]):
+        """(Re)build from project documents; other sources are skipped."""
+        self.tags, self.domain_mask, self.doc_ids, self.bitsets = [], 0, [], []
+        self._bits = {}
+        for doc in documents:
+            if doc.metadata.get("source") != "projects":
+                continue
+            bitset = 0
+            for field in TAG_FIELDS:
+                for raw in str(doc.metadata.get(field) or "").split(","):
+                    tag = normalize_tag(raw)
+                    if not tag:
+                        continue
+                    bit = self._bits.get(tag)
+                    if bit is None:
+                        bit = self._bits[tag] = len(self.tags)
+                        self.tags.append(tag)
+                    if field == "domains":
+                        self.domain_mask |= 1 << bit
+                    bitset |= 1 << bit
+            self.doc_ids.append(doc.metadata["doc_id"])
+            self.bitsets.append(bitset)
+        self._prepare()
+
+    def _prepare(self):
+        """Phrase lookup keyed by first word, longest phrases first."""
+        self._bits = {tag: bit for bit, tag in enumerate(self.tags)}
+        self._phrases = {}
+        for tag, bit in self._bits.items():
+            words = tuple(tag.split())
+            self._phrases.setdefault(words[0], []).append((words, bit))
+        for candidates in self._phrases.values():
+            candidates.sort(key=lambda item: len(item[0]), reverse=True)
+
+    def save(self, directory: str):
+        """Write the index atomically to directory/FILE_NAME."""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = Path(directory) / self.FILE_NAME
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "tags": self.tags,
+                "domain_mask": format(self.domain_mask, "x"),
+                "doc_ids": self.doc_ids,
+                "bitsets": [format(bitset, "x") for bitset in self.bitsets]
+            }, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["TagIndex"]:
+        """Load a saved index, or None if there isn't one."""
+        path = Path(directory) / cls.FILE_NAME
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        index.tags = data["tags"]
+        index.domain_mask = int(data["domain_mask"], 16)
+        index.doc_ids = data["doc_ids"]
+        index.bitsets = [int(bitset, 16) for bitset in data["bitsets"]]
+        index._prepare()
+        return index
+
+    def tag_query(self, text: str) -> int:
+        """Bitset of the vocabulary tags mentioned in text (whole-word phrase matches)."""
+        words = normalize_words(text)
+        mask = 0
+        for i, word in enumerate(words):
+            for phrase, bit in self._phrases.get(word, ()):
+                if tuple(words[i:i + len(phrase)]) == phrase:
+                    mask |= 1 << bit
+        return mask
+
+    def score(self, bitset: int, mask: int) -> int:
+        """Weighted shared tags: domain tags count TAG_FIELDS['domains'], keywords count 1."""
+        shared = bitset & mask
+        domains = _popcount(shared & self.domain_mask)
+        return domains * TAG_FIELDS["domains"] + (_popcount(shared) - domains) * TAG_FIELDS["keywords"]
+
+    def rank(self, mask: int) -> List[Tuple[str, int]]:
+        """(doc_id, score) of every project sharing a tag with the mask, best first."""
+        if not mask:
+            return []
+        scored = [
+            (doc_id, self.score(bitset, mask))
+            for doc_id, bitset in zip(self.doc_ids, self.bitsets)
+            if bitset & mask
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def confident(self, ranked: List[Tuple[str, int]], k: int, min_score: int) -> bool:
+        """
+        Whether tags alone settle the top k: at least k projects reach min_score
+        and the k-th is strictly ahead of the next one (no tie at the cut).
+        """
+        if len(ranked) < k or ranked[k - 1][1] < min_score:
+            return False
+        return len(ranked) == k or ranked[k][1] < ranked[k - 1][1]
+
+    def describe(self, mask: int) -> List[str]:
+        """Tag names in a bitset."""
+        return [tag for bit, tag in enumerate(self.tags) if mask >> bit & 1]
@@ -2,75 +2,634 @@
 Vector store setup using ChromaDB for RAGmail system.
 """
 
-from typing import List, Optional
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from typing import List, Optional, Dict, Tuple, TYPE_CHECKING
 from pathlib import Path
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from src.document_loader import RAGmailDocumentLoader
+from src.embedding_cache import EmbeddingCache
+from src.indexer import IncrementalIndexer
+from src.lexical_index import BM25Index
+from src.tag_index import TagIndex
+from src import metrics
+
+# numpy, sentence-transformers (torch) and chromadb are imported on first use
+# so importing this module stays fast.
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# How research tags steer project retrieval (see RAGmailVectorStore.search_projects_only)
+TAG_MODES = ("off", "boost", "prefilter", "strict")
+
+TAG_ROUTES = metrics.REGISTRY.counter(
+    "ragmail_tag_routes_total",
+    "Project searches by how research tags were used",
+    ["route"]
+)
+
+# Loaded models are shared by every engine in the process. Loading one before
+# the server forks its workers (preload_embedding_model) lets them share the
+# weights copy-on-write instead of each holding a private copy.
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_name: str = EMBEDDING_MODEL, device: str = "cpu"):
+    """Load (once per process) and return a SentenceTransformer."""
+    key = f"{model_name}@{device}"
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name, device=device)
+                _models[key] = model
+    return model
+
+
+def preload_embedding_model(model_name: str = EMBEDDING_MODEL, device: str = "cpu"):
+    """
+    Load the embedding weights without running inference.
+    
+    Safe to call before forking: no encode() means no torch/tokenizer thread
+    pools exist yet, so workers inherit the weights but no threads.
+    """
+    return load_sentence_transformer(model_name, device)
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    Batched sentence-transformers encoder for index builds.
+    
+    Large inputs can be spread across a multi-process pool (one worker per
+    CPU core by default). Output is float32 and, optionally, L2-normalized.
+    """
+    
+    # Inputs are encoded in slices of this many batches so progress can be reported
+    PROGRESS_BATCHES = 16
+    
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        batch_size: int = 64,
+        processes: int = 1,
+        normalize: bool = True,
+        show_progress: bool = True,
+        device: str = "cpu"
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes if processes > 0 else (os.cpu_count() or 1)
+        self.normalize = normalize
+        self.show_progress = show_progress
+        self.device = device
+        self._model = None
+        self._pool = None
+        self.last_stats: Dict[str, float] = {}
+    
+    @property
+    def model(self):
+        """The SentenceTransformer, loaded on first use (or taken from the preloaded one)."""
+        if self._model is None:
+            self._model = load_sentence_transformer(self.model_name, self.device)
+        return self._model
+    
+    @property
+    def loaded(self) -> bool:
+        """Whether the model weights are in memory."""
+        return self._model is not None
+    
+    @property
+    def signature(self) -> str:
+        """Identifies the vectors this engine produces (model + normalization)."""
+        return f"{self.model_name}|normalized={self.normalize}"
+    
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            atexit.register(self.close)
+        return self._pool
+    
+    def close(self):
+        """Stop the multi-process pool, if one was started."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+    
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        """Encode texts into a float32 matrix, reporting throughput in docs/sec."""
+        import numpy as np
+        
+        start = time.perf_counter()
+        use_pool = self.processes > 1 and len(texts) > self.batch_size
+        slice_size = self.batch_size * self.PROGRESS_BATCHES * (self.processes if use_pool else 1)
+        
+        parts = []
+        for offset in range(0, len(texts), slice_size):
+            batch = texts[offset:offset + slice_size]
+            parts.append(self.model.encode(
+                batch,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                pool=self._get_pool() if use_pool else None
+            ))
+            done = offset + len(batch)
+            if self.show_progress and len(texts) > slice_size:
+                elapsed = time.perf_counter() - start
+                print(f"  Embedded {done}/{len(texts)} documents ({done / elapsed:.1f} docs/sec)")
+        
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "documents": len(texts),
+            "seconds": elapsed,
+            "docs_per_sec": len(texts) / elapsed if elapsed > 0 else 0.0,
+            "processes": self.processes if use_pool else 1
+        }
+        
+        dim = self.model.get_sentence_embedding_dimension()
+        if not parts:
+            return np.zeros((0, dim), dtype=np.float32)
+        return np.ascontiguousarray(np.vstack(parts), dtype=np.float32)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """LangChain Embeddings interface for documents."""
+        return self.encode(list(texts)).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        """LangChain Embeddings interface for a single query."""
+        import numpy as np
+        
+        return self.model.encode(
+            text, normalize_embeddings=self.normalize, convert_to_numpy=True
+        ).astype(np.float32).tolist()
 
 
 class RAGmailVectorStore:
     """Manage vector store for semantic search."""
     
-    def __init__(self, persist_directory: str = "chroma_db"):
+    PARENTS_FILE = "parent_documents.json"
+    
+    def __init__(
+        self,
+        persist_directory: str = "chroma_db",
+        use_embedding_cache: bool = True,
+        embed_batch_size: Optional[int] = None,
+        embed_processes: Optional[int] = None,
+        backend: Optional[str] = None,
+        hybrid: Optional[bool] = None,
+        tag_mode: Optional[str] = None,
+        quantization: Optional[str] = None,
+        read_only: bool = False
+    ):
         self.persist_directory = persist_directory
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
+        # Serving processes never write the index; several workers can then share it
+        self.read_only = read_only
+        # "chroma" (default) or "numpy" (in-process brute-force index)
+        self.backend = (backend or os.getenv("RAGMAIL_VECTOR_BACKEND", "chroma")).lower()
+        if self.backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown vector backend: {self.backend} (use 'chroma' or 'numpy')")
+        # "int8" or "binary" codes (numpy backend) shrink what every search scans
+        self.quantization = (quantization or os.getenv("RAGMAIL_QUANTIZATION", "none")).lower()
+        if self.quantization != "none" and self.backend != "numpy":
+            raise ValueError("RAGMAIL_QUANTIZATION requires the numpy vector backend")
+        # Quantized candidates rescored in float32 per result (sign bits need a wider pool)
+        self.rescore_factor = int(os.getenv(
+            "RAGMAIL_RESCORE_FACTOR", "10" if self.quantization == "binary" else "4"
+        ))
+        # Fuse BM25 with vector search for project retrieval (reciprocal rank fusion)
+        if hybrid is None:
+            hybrid = os.getenv("RAGMAIL_HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+        self.hybrid = hybrid
+        self._lexical_index: Optional[BM25Index] = None
+        self._lexical_loaded = False
+        self.tag_mode = (tag_mode or os.getenv("RAGMAIL_TAG_MODE", "boost")).lower()
+        if self.tag_mode not in TAG_MODES:
+            raise ValueError(f"Unknown tag mode: {self.tag_mode} (use one of {', '.join(TAG_MODES)})")
+        # Weighted tag score every strict-mode result must reach (a domain match counts 2)
+        self.tag_strict_min_score = int(os.getenv("RAGMAIL_TAG_STRICT_MIN_SCORE", "3"))
+        self._tag_index: Optional[TagIndex] = None
+        self._tag_loaded = False
+        self.embed_batch_size = embed_batch_size or int(os.getenv("RAGMAIL_EMBED_BATCH_SIZE", "64"))
+        self._parents: Optional[Dict[str, Document]] = None
+        self.embeddings = EmbeddingEngine(
+            model_name=EMBEDDING_MODEL,
+            batch_size=self.embed_batch_size,
+            processes=embed_processes if embed_processes is not None else
+                int(os.getenv("RAGMAIL_EMBED_PROCESSES", "1")),
+            normalize=os.getenv("RAGMAIL_EMBED_NORMALIZE", "true").lower() in ("1", "true", "yes")
         )
-        self.vectorstore: Optional[Chroma] = None
+        # Identifies the vectors in the index and cache (model + normalization)
+        self.embedding_model = self.embeddings.signature
+        self._vectorstore = None
+        self._open_on_first_use = False
+        self._open_lock = threading.Lock()
+        
+        # Query embeddings are cached in memory and on disk next to the index
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if use_embedding_cache:
+            self.embedding_cache = EmbeddingCache(
+                self.embedding_model,
+                cache_dir=str(Path(persist_directory).parent / "embedding_cache")
+            )
     
-    def create_vectorstore(self, documents: List[Document]) -> Chroma:
-        """Create and persist vector store from documents."""
+    @property
+    def vectorstore(self):
+        """The backend index; a lazily loaded store is opened on first access."""
+        if self._vectorstore is None and self._open_on_first_use:
+            with self._open_lock:
+                if self._vectorstore is None:
+                    self.open_vectorstore()
+                    print(f"Loaded {self.backend} vector store from {self.index_directory}")
+        return self._vectorstore
+    
+    @vectorstore.setter
+    def vectorstore(self, value):
+        self._vectorstore = value
+    
+    @property
+    def index_directory(self) -> str:
+        """Directory holding this backend's index files (and its manifest)."""
+        if self.backend == "numpy":
+            return str(Path(self.persist_directory) / "numpy_index")
+        return self.persist_directory
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError(
+                f"Vector store at {self.index_directory} is opened read-only; "
+                "rebuild it with init_db.py instead"
+            )
+    
+    def create_vectorstore(self, documents: List[Document]):
+        """Create and persist vector store from documents, replacing any existing collection."""
+        self._check_writable()
         print(f"Creating vector store with {len(documents)} documents...")
         
-        self.vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory=self.persist_directory
-        )
+        self.open_vectorstore()
+        self.reset()
+        self.add_documents(documents)
         
         print(f"Vector store created and persisted to {self.persist_directory}")
         return self.vectorstore
     
-    def load_vectorstore(self) -> Chroma:
-        """Load existing vector store."""
-        if not Path(self.persist_directory).exists():
+    def open_vectorstore(self):
+        """Open the persisted vector store, creating an empty one if needed."""
+        if self.backend == "numpy":
+            from src.numpy_store import NumpyVectorIndex
+            self.vectorstore = NumpyVectorIndex(
+                self.index_directory, quantization=self.quantization, rescore_factor=self.rescore_factor
+            )
+        else:
+            from langchain_community.vectorstores import Chroma
+            self.vectorstore = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings
+            )
+        return self.vectorstore
+    
+    def load_vectorstore(self, lazy: bool = False):
+        """
+        Load existing vector store.
+        
+        With lazy=True only the index's existence is checked; the client is
+        created on first use.
+        """
+        missing = not Path(self.persist_directory).exists()
+        if self.backend == "numpy":
+            from src.numpy_store import NumpyVectorIndex
+            missing = not (Path(self.index_directory) / NumpyVectorIndex.MATRIX_FILE).exists()
+        if missing:
             raise FileNotFoundError(
-                f"Vector store not found at {self.persist_directory}. "
+                f"Vector store not found at {self.index_directory}. "
                 "Please create it first using create_vectorstore()."
             )
         
-        self.vectorstore = Chroma(
-            persist_directory=self.persist_directory,
-            embedding_function=self.embeddings
-        )
+        if lazy:
+            self._open_on_first_use = True
+            return None
+        
+        self.open_vectorstore()
         
-        print(f"Loaded vector store from {self.persist_directory}")
+        print(f"Loaded {self.backend} vector store from {self.index_directory}")
         return self.vectorstore
     
-    def search_similar(self, query: str, k: int = 3, filter_dict: Optional[dict] = None) -> List[Document]:
-        """Search for similar documents."""
+    def warm_up(self):
+        """Open the index and load the embedding model now instead of on first query."""
+        _ = self.vectorstore
+        self.embeddings.embed_query("warm-up")
+    
+    def footprint(self) -> Dict[str, int]:
+        """Index size on disk and, for the numpy backend, the bytes every search scans."""
+        if self.backend == "numpy":
+            return self.vectorstore.footprint()
+        directory = Path(self.persist_directory)
+        return {
+            "disk_bytes": sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+            if directory.exists() else 0
+        }
+    
+    def add_documents(self, documents: List[Document]) -> List[str]:
+        """Embed and add documents, using their stable 'doc_id' metadata as IDs."""
+        self._check_writable()
+        if not documents:
+            return []
+        ids = [doc.metadata["doc_id"] for doc in documents]
+        
+        # Embed everything in one engine pass (batched / multi-process), then write
+        embeddings = self.embeddings.encode([doc.page_content for doc in documents])
+        stats = self.embeddings.last_stats
+        print(
+            f"Embedded {stats['documents']} documents in {stats['seconds']:.1f}s "
+            f"({stats['docs_per_sec']:.1f} docs/sec, {stats['processes']} process(es))"
+        )
+        
+        if self.backend == "numpy":
+            self.vectorstore.upsert(ids, embeddings, documents)
+            return ids
+        
+        collection = self.vectorstore._collection
+        for start in range(0, len(documents), self.embed_batch_size):
+            end = start + self.embed_batch_size
+            collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=[doc.page_content for doc in documents[start:end]],
+                metadatas=[doc.metadata for doc in documents[start:end]]
+            )
+        return ids
+    
+    def delete_documents(self, ids: List[str]):
+        """Delete documents by stable ID."""
+        self._check_writable()
+        if ids:
+            self.vectorstore.delete(ids=list(ids))
+    
+    def reset(self):
+        """Drop every document from the persisted collection."""
+        self._check_writable()
+        self.vectorstore.delete_collection()
+        self.open_vectorstore()
+    
+    def get_documents(self, filter_dict: Optional[dict] = None) -> List[Document]:
+        """Every stored document (optionally filtered), without a similarity search."""
+        if self.backend == "numpy":
+            return self.vectorstore.get_documents(filter_dict)
+        
+        result = self.vectorstore.get(where=filter_dict) if filter_dict else self.vectorstore.get()
+        return [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(result["documents"], result["metadatas"])
+        ]
+    
+    def save_parent_documents(self, documents: List[Document]):
+        """Persist the unchunked parents that chunk hits are mapped back to."""
+        self._check_writable()
+        Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+        payload = {
+            doc.metadata["doc_id"]: {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc in documents
+        }
+        with open(Path(self.persist_directory) / self.PARENTS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        self._parents = None
+    
+    def parent_documents(self) -> Dict[str, Document]:
+        """Parent documents by doc_id (loaded once from disk)."""
+        if self._parents is None:
+            path = Path(self.persist_directory) / self.PARENTS_FILE
+            self._parents = {}
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    for doc_id, data in json.load(f).items():
+                        self._parents[doc_id] = Document(**data)
+        return self._parents
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, going through the embedding cache when enabled."""
+        with metrics.span("embedding"):
+            if self.embedding_cache is None:
+                return self.embeddings.embed_query(query)
+            
+            embedding = self.embedding_cache.get(query)
+            metrics.record_cache("embedding", embedding is not None)
+            if embedding is None:
+                embedding = self.embeddings.embed_query(query)
+                self.embedding_cache.put(query, embedding)
+            return embedding
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Query embedding cache counters (empty when the cache is disabled)."""
+        if self.embedding_cache is None:
+            return {}
+        return self.embedding_cache.stats()
+    
+    def search_similar(
+        self,
+        query: str,
+        k: int = 3,
+        filter_dict: Optional[dict] = None,
+        parents: bool = False,
+        doc_ids: Optional[List[str]] = None
+    ) -> List[Document]:
+        """
+        Search for similar documents.
+        
+        With parents=True, chunk hits are collapsed to their parent document
+        (one result per parent, best-ranked first). doc_ids restricts the
+        search to those documents.
+        """
         if self.vectorstore is None:
             raise ValueError("Vector store not initialized. Load or create it first.")
         
-        if filter_dict:
-            return self.vectorstore.similarity_search(query, k=k, filter=filter_dict)
-        return self.vectorstore.similarity_search(query, k=k)
+        # Query Chroma by vector so cached embeddings skip the model entirely
+        embedding = self.embed_query(query)
+        fetch_k = k * 4 if parents else k
+        hits = self._vector_search(embedding, fetch_k, filter_dict, doc_ids)
+        
+        if not parents:
+            return hits
+        
+        results, seen = [], set()
+        parent_docs = self.parent_documents()
+        for doc in hits:
+            parent_id = doc.metadata.get("parent_id", doc.metadata.get("doc_id"))
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+            results.append(parent_docs.get(parent_id, doc))
+        return results[:k]
+    
+    def _vector_search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter_dict: Optional[dict],
+        doc_ids: Optional[List[str]] = None
+    ) -> List[Document]:
+        """Dense top-k by query embedding, optionally among doc_ids only."""
+        with metrics.span("vector_search"):
+            if doc_ids is not None:
+                if self.backend == "numpy":
+                    return self.vectorstore.similarity_search_by_vector(
+                        embedding, k=k, filter=filter_dict, ids=doc_ids
+                    )
+                conditions = [{key: value} for key, value in (filter_dict or {}).items()]
+                conditions.append({"doc_id": {"$in": list(doc_ids)}})
+                where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+                return self.vectorstore.similarity_search_by_vector(embedding, k=k, filter=where)
+            if filter_dict:
+                return self.vectorstore.similarity_search_by_vector(embedding, k=k, filter=filter_dict)
+            return self.vectorstore.similarity_search_by_vector(embedding, k=k)
+    
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        """The BM25 index saved next to the vector index (None if never built)."""
+        if not self._lexical_loaded:
+            self._lexical_index = BM25Index.load(self.index_directory)
+            self._lexical_loaded = True
+        return self._lexical_index
+    
+    def build_lexical_index(self, documents: List[Document]):
+        """Rebuild and persist the BM25 index over all indexed documents."""
+        self._check_writable()
+        index = BM25Index()
+        index.build(documents)
+        index.save(self.index_directory)
+        self._lexical_index = index
+        self._lexical_loaded = True
+    
+    @property
+    def tag_index(self) -> Optional[TagIndex]:
+        """The research-tag index saved next to the vector index (None if never built)."""
+        if not self._tag_loaded:
+            self._tag_index = TagIndex.load(self.index_directory)
+            self._tag_loaded = True
+        return self._tag_index
+    
+    def build_tag_index(self, documents: List[Document]):
+        """Rebuild and persist the research-tag index over the project documents."""
+        self._check_writable()
+        index = TagIndex()
+        index.build(documents)
+        index.save(self.index_directory)
+        self._tag_index = index
+        self._tag_loaded = True
+    
+    def get_by_ids(self, ids: List[str]) -> Dict[str, Document]:
+        """Stored documents by doc_id."""
+        if not ids:
+            return {}
+        if self.backend == "numpy":
+            wanted = set(ids)
+            return {
+                doc.metadata["doc_id"]: doc
+                for doc in self.vectorstore.get_documents()
+                if doc.metadata.get("doc_id") in wanted
+            }
+        result = self.vectorstore.get(ids=list(ids))
+        return {
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+    
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 3,
+        filter_dict: Optional[dict] = None,
+        fetch_k: Optional[int] = None,
+        rrf_k: int = 60,
+        doc_ids: Optional[List[str]] = None,
+        tag_ranking: Optional[List[Tuple[str, int]]] = None,
+        lexical: bool = True
+    ) -> List[Document]:
+        """
+        Reciprocal rank fusion of vector and BM25 results.
+        
+        Each list contributes 1 / (rrf_k + rank) per document, so a project
+        ranked well by either exact terms or meaning rises to the top.
+        A tag ranking, when given, is fused as a third list; doc_ids limits
+        both searches to those documents. Falls back to plain vector search
+        when there is nothing to fuse.
+        """
+        if self.vectorstore is None:
+            raise ValueError("Vector store not initialized. Load or create it first.")
+        use_lexical = lexical and self.lexical_index is not None
+        if not use_lexical and not tag_ranking:
+            return self.search_similar(query, k=k, filter_dict=filter_dict, doc_ids=doc_ids)
+        
+        fetch_k = fetch_k or max(k * 4, 10)
+        dense = self._vector_search(self.embed_query(query), fetch_k, filter_dict, doc_ids)
+        docs: Dict[str, Document] = {doc.metadata["doc_id"]: doc for doc in dense}
+        rankings = [list(docs)]
+        if use_lexical:
+            with metrics.span("lexical_search"):
+                sparse = self.lexical_index.search(query, k=fetch_k, filter_dict=filter_dict, doc_ids=doc_ids)
+            rankings.append([doc_id for doc_id, _ in sparse])
+        if tag_ranking:
+            rankings.append([doc_id for doc_id, _ in tag_ranking[:fetch_k]])
+        
+        scores: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, doc_id in enumerate(ranking, start=1):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+        
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        docs.update(self.get_by_ids([doc_id for doc_id in top if doc_id not in docs]))
+        return [docs[doc_id] for doc_id in top if doc_id in docs]
     
     def search_projects_only(self, query: str, k: int = 3) -> List[Document]:
-        """Search only in projects."""
-        return self.search_similar(query, k=k, filter_dict={"source": "projects"})
+        """
+        Search only in projects.
+        
+        The query is first matched against the precomputed research tags
+        (RAGMAIL_TAG_MODE): "boost" fuses the tag ranking into the results,
+        "prefilter" also scores only tagged projects when there are at least
+        k of them, and "strict" returns the tag matches outright, skipping the
+        embedding and vector search, when they settle the top k on their own
+        (otherwise it prefilters).
+        """
+        filter_dict = {"source": "projects"}
+        tags = self.tag_index if self.tag_mode != "off" else None
+        ranked = []
+        if tags is not None:
+            with metrics.span("tag_match"):
+                ranked = tags.rank(tags.tag_query(query))
+        
+        if self.tag_mode == "strict" and ranked and tags.confident(ranked, k, self.tag_strict_min_score):
+            top = [doc_id for doc_id, _ in ranked[:k]]
+            docs = self.get_by_ids(top)
+            if len(docs) == len(top):
+                TAG_ROUTES.inc(route="strict")
+                return [docs[doc_id] for doc_id in top]
+        
+        doc_ids = None
+        if self.tag_mode in ("prefilter", "strict") and len(ranked) >= k:
+            doc_ids = [doc_id for doc_id, _ in ranked]
+        if tags is not None:
+            TAG_ROUTES.inc(route="prefilter" if doc_ids else "boost" if ranked else "untagged")
+        
+        if self.hybrid or ranked:
+            return self.hybrid_search(
+                query, k=k, filter_dict=filter_dict, doc_ids=doc_ids, tag_ranking=ranked, lexical=self.hybrid
+            )
+        return self.search_similar(query, k=k, filter_dict=filter_dict)
 
 
-def initialize_vector_db():
-    """Initialize vector database with all documents."""
-    loader = RAGmailDocumentLoader()
-    documents = loader.load_all_documents()
-    
+def initialize_vector_db(full: bool = False):
+    """Initialize (or incrementally update) the vector database with all documents."""
     vector_store = RAGmailVectorStore()
-    vector_store.create_vectorstore(documents)
+    IncrementalIndexer(RAGmailDocumentLoader(), vector_store).sync(full=full)
     
     return vector_store
 
@@ -78,7 +637,7 @@ def initialize_vector_db():
 if __name__ == "__main__":
     # Initialize the vector database
     print("Initializing RAGmail Vector Database...")
-    vs = initialize_vector_db()
+    vs = initialize_vector_db(full="--full" in sys.argv)
     
     # Test search
     print("\n=== Testing Search ===")
@@ -0,0 +1,26 @@
+"""
+Tests for section-aware chunking in src/document_loader.py.
+"""
+
+from src.document_loader import chunk_text, estimate_tokens
+
+
+def test_long_paragraph_chunks_overlap():
+    text = " ".join(f"w{i}" for i in range(300))
+    chunks = [chunk for _, chunk in chunk_text(text, chunk_tokens=60, chunk_overlap=20)]
+    
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        assert estimate_tokens(current) <= 60
+        shared = set(previous.split()) & set(current.split())
+        assert 15 <= estimate_tokens(" ".join(shared)) <= 20
+    
+    covered = set(word for chunk in chunks for word in chunk.split())
+    assert covered == {f"w{i}" for i in range(300)}
+
+
+def test_long_paragraph_without_overlap():
+    text = " ".join(f"w{i}" for i in range(300))
+    chunks = [chunk.split() for _, chunk in chunk_text(text, chunk_tokens=60, chunk_overlap=0)]
+    
+    assert sum(len(chunk) for chunk in chunks) == 300
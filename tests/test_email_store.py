@@ -0,0 +1,54 @@
+"""
+Tests for stored-email reuse in src/email_store.py and src/email_generator.py.
+"""
+
+from src.email_generator import EmailGenerator
+from src.email_store import EmailStore, email_key
+
+
+def fake_generate(professor_name, university_name, research_domain, paper_title, paper_summary, use_specific_project):
+    return {
+        "subject": f"Research on {research_domain}",
+        "body": f"I enjoyed your paper {paper_title}, which {paper_summary}.",
+        "metadata": {"template_type": "paper", "selected_project": "HireFlow", "relevance_score": 8}
+    }
+
+
+def make_generator(tmp_path, monkeypatch) -> EmailGenerator:
+    generator = EmailGenerator(email_store=EmailStore(str(tmp_path / "emails.sqlite")))
+    monkeypatch.setattr(generator, "_generate_email", fake_generate)
+    return generator
+
+
+def test_key_includes_paper_summary():
+    first = email_key("Dr. Jane Smith", "MIT", "NLP", "Planning", "explores coordination")
+    second = email_key("Jane Smith", "mit", "nlp", "planning", "studies negotiation")
+
+    assert first != second
+    assert first == email_key("Prof. Jane Smith", "MIT ", "NLP", "Planning", "Explores coordination.")
+
+
+def test_different_paper_summary_is_not_reused(tmp_path, monkeypatch):
+    generator = make_generator(tmp_path, monkeypatch)
+    request = dict(professor_name="Dr. Jane Smith", university_name="MIT", research_domain="NLP",
+                   paper_title="Coordinated Planning")
+
+    first = generator.generate_email(**request, paper_summary="explores coordination mechanisms")
+    second = generator.generate_email(**request, paper_summary="studies agent negotiation")
+
+    assert not second["metadata"]["stored"]
+    assert "studies agent negotiation" in second["body"]
+    assert second["metadata"]["email_id"] != first["metadata"]["email_id"]
+
+
+def test_same_request_is_reused(tmp_path, monkeypatch):
+    generator = make_generator(tmp_path, monkeypatch)
+    request = dict(professor_name="Dr. Jane Smith", university_name="MIT", research_domain="NLP",
+                   paper_title="Coordinated Planning", paper_summary="explores coordination mechanisms")
+
+    first = generator.generate_email(**request)
+    again = generator.generate_email(**request)
+
+    assert again["metadata"]["stored"]
+    assert again["metadata"]["email_id"] == first["metadata"]["email_id"]
+    assert again["body"] == first["body"]
@@ -0,0 +1,69 @@
+"""
+Tests for parsing the LLM's project selection in src/rag_chain.py.
+"""
+
+import json
+import pytest
+from langchain_core.documents import Document
+from src.rag_chain import ProfessorProjectMatcher
+
+PROJECTS = [
+    Document(page_content="", metadata={"title": "HireFlow", "domains": ["NLP"]}),
+    Document(page_content="", metadata={"title": "GraphLab", "domains": ["Graphs"]}),
+]
+
+
+class FakeLLM:
+    def bind(self, **kwargs):
+        return self
+
+
+def make_matcher() -> ProfessorProjectMatcher:
+    # Parsing needs no LLM or vector store
+    matcher = ProfessorProjectMatcher.__new__(ProfessorProjectMatcher)
+    matcher.reranker = None
+    matcher.llm = FakeLLM()
+    return matcher
+
+
+def fused(number) -> str:
+    return json.dumps({"selected_project_number": number, "paragraph": "My project fits your work."})
+
+
+def test_fused_in_range_selects_project():
+    result = make_matcher()._parse_fused(fused(2), PROJECTS)
+
+    assert result["project_document"] is PROJECTS[1]
+    assert result["project_title"] == "GraphLab"
+
+
+@pytest.mark.parametrize("number", [0, -1, 3, "two", None])
+def test_fused_out_of_range_is_rejected(number):
+    assert make_matcher()._parse_fused(fused(number), PROJECTS) is None
+
+
+@pytest.mark.parametrize("number", [0, 3, "two"])
+def test_selection_out_of_range_falls_back_to_top_project(number):
+    content = json.dumps({"selected_project_number": number, "project_title": "Nonexistent"})
+
+    result = make_matcher()._parse_selection(content, PROJECTS)
+
+    assert result["project_document"] is PROJECTS[0]
+    assert result["selected_project_number"] == 1
+    assert result["project_title"] == "HireFlow"
+
+
+def test_out_of_range_fused_response_uses_two_call_path(monkeypatch):
+    matcher = make_matcher()
+    paragraphs = []
+    monkeypatch.setattr(matcher, "_invoke", lambda *args, **kwargs: fused(0))
+    monkeypatch.setattr(
+        matcher, "generate_project_paragraph",
+        lambda *args: paragraphs.append(args[-1]["project_title"]) or "Separate paragraph."
+    )
+
+    result = matcher.select_and_write_paragraph("Dr. Smith", "NLP", matching_projects=PROJECTS)
+
+    assert paragraphs == ["HireFlow"]
+    assert result["project_document"] is PROJECTS[0]
+    assert result["project_paragraph"] == "Separate paragraph."
@@ -0,0 +1,44 @@
+"""
+Tests for /api/projects in backend/main.py.
+"""
+
+import json
+import pytest
+from fastapi.testclient import TestClient
+from src.email_generator import EmailGenerator
+import backend.main as api
+
+PROJECTS = [{"id": "hireflow", "title": "HireFlow", "type": "web", "domain": ["NLP"], "description": "Hiring."}]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The loader reads data/projects.json relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RAGMAIL_EMAIL_STORE", "false")
+    monkeypatch.setattr(api, "email_generator", EmailGenerator())
+    monkeypatch.setattr(api, "_projects_body", ("", b""))
+    return TestClient(api.app)
+
+
+def write_projects(tmp_path, projects):
+    (tmp_path / "data").mkdir(exist_ok=True)
+    (tmp_path / "data" / "projects.json").write_text(json.dumps(projects), encoding="utf-8")
+
+
+def test_lists_the_generators_catalog(tmp_path, client):
+    write_projects(tmp_path, PROJECTS)
+
+    response = client.get("/api/projects")
+
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()["projects"]] == ["hireflow"]
+    assert response.headers["etag"] == f'"{api.email_generator.loader.catalog.etag}"'
+    assert client.get("/api/projects", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_missing_catalog_is_not_found(client):
+    response = client.get("/api/projects")
+
+    assert response.status_code == 404
+    assert "projects.json" in response.json()["detail"]
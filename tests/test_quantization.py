@@ -0,0 +1,80 @@
+"""
+Tests for the quantized NumPy index in src/numpy_store.py: recall@k against
+float32 and the bytes each search scans.
+"""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.numpy_store import NumpyVectorIndex
+
+K = 10
+# Recall@k floors relative to the float32 results (after float rescoring)
+INT8_RECALL_FLOOR = 0.95
+BINARY_RECALL_FLOOR = 0.8
+
+
+def clustered_vectors(rng: np.random.Generator, centers: np.ndarray, n: int) -> np.ndarray:
+    """Dense, normalized vectors around topic centers, like sentence embeddings."""
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.8 * rng.normal(size=(n, centers.shape[1]))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(50, 384))
+    vectors = clustered_vectors(rng, centers, 2000)
+    queries = clustered_vectors(rng, centers, 40)
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    documents = [
+        Document(page_content=doc_id, metadata={"doc_id": doc_id, "source": "projects" if i % 4 else "skills"})
+        for i, doc_id in enumerate(ids)
+    ]
+    return ids, vectors, documents, queries
+
+
+def build(tmp_path, corpus, quantization: str, rescore_factor: int = 4) -> NumpyVectorIndex:
+    ids, vectors, documents, _ = corpus
+    index = NumpyVectorIndex(str(tmp_path / quantization), quantization=quantization, rescore_factor=rescore_factor)
+    index.upsert(ids, vectors, documents)
+    return index
+
+
+def recall(index: NumpyVectorIndex, baseline: NumpyVectorIndex, queries: np.ndarray, **search) -> float:
+    found = []
+    for query in queries:
+        expected = {doc.metadata["doc_id"] for doc in baseline.similarity_search_by_vector(query, k=K, **search)}
+        hits = {doc.metadata["doc_id"] for doc in index.similarity_search_by_vector(query, k=K, **search)}
+        found.append(len(expected & hits) / len(expected))
+    return float(np.mean(found))
+
+
+@pytest.mark.parametrize("quantization, rescore_factor, floor", [
+    ("int8", 4, INT8_RECALL_FLOOR),
+    ("binary", 10, BINARY_RECALL_FLOOR),
+])
+def test_recall_against_float(tmp_path, corpus, quantization, rescore_factor, floor):
+    baseline = build(tmp_path, corpus, "none")
+    index = build(tmp_path, corpus, quantization, rescore_factor)
+    queries = corpus[3]
+
+    assert recall(index, baseline, queries) >= floor
+    assert recall(index, baseline, queries, filter={"source": "projects"}) >= floor
+
+
+@pytest.mark.parametrize("quantization, ratio", [("int8", 3), ("binary", 20)])
+def test_quantization_reduces_bytes_scanned(tmp_path, corpus, quantization, ratio):
+    baseline = build(tmp_path, corpus, "none").footprint()
+    footprint = build(tmp_path, corpus, quantization).footprint()
+
+    assert footprint["vectors"] == baseline["vectors"]
+    assert footprint["search_memory_bytes"] * ratio <= baseline["search_memory_bytes"]
+
+
+def test_codes_reload_from_disk(tmp_path, corpus):
+    index = build(tmp_path, corpus, "int8")
+    reopened = NumpyVectorIndex(str(tmp_path / "int8"), quantization="int8")
+
+    assert (tmp_path / "int8" / "embeddings.int8.npz").exists()
+    assert np.array_equal(reopened._codes, index._codes)
@@ -0,0 +1,91 @@
+"""
+Tests for the read-only vector store that API workers share (src/vector_store.py).
+"""
+
+import sys
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.numpy_store import NumpyVectorIndex
+from src.vector_store import RAGmailVectorStore
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    """A persisted numpy index of 50 random project vectors."""
+    persist_directory = tmp_path / "chroma_db"
+    writer = RAGmailVectorStore(str(persist_directory), use_embedding_cache=False, backend="numpy")
+    rng = np.random.default_rng(0)
+    ids = [f"projects:p{i}" for i in range(50)]
+    documents = [Document(page_content=doc_id, metadata={"doc_id": doc_id, "source": "projects"}) for doc_id in ids]
+    NumpyVectorIndex(writer.index_directory).upsert(ids, rng.normal(size=(50, 16)).astype(np.float32), documents)
+    return persist_directory
+
+
+def open_read_only(persist_directory) -> RAGmailVectorStore:
+    store = RAGmailVectorStore(str(persist_directory), use_embedding_cache=False, backend="numpy", read_only=True)
+    store.load_vectorstore()
+    return store
+
+
+def test_writes_raise(index_dir):
+    store = open_read_only(index_dir)
+    document = Document(page_content="x", metadata={"doc_id": "projects:new", "source": "projects"})
+
+    for write in (
+        lambda: store.add_documents([document]),
+        lambda: store.delete_documents(["projects:p0"]),
+        lambda: store.reset(),
+        lambda: store.create_vectorstore([document]),
+        lambda: store.save_parent_documents([document]),
+        lambda: store.build_lexical_index([document]),
+        lambda: store.build_tag_index([document]),
+    ):
+        with pytest.raises(RuntimeError):
+            write()
+    assert len(store.vectorstore.ids) == 50
+
+
+def test_matrix_is_memory_mapped(index_dir):
+    store = open_read_only(index_dir)
+    index = store.vectorstore
+    query = np.ones(16, dtype=np.float32).tolist()
+
+    hits = index.similarity_search_by_vector(query, k=3)
+
+    # Workers share the file's pages instead of each holding a private copy
+    assert len(hits) == 3
+    assert isinstance(index.matrix, np.memmap)
+    assert index.matrix.mode == "r"
+    assert not index.matrix.flags.writeable
+    assert str(index.matrix.filename).endswith(NumpyVectorIndex.MATRIX_FILE)
+
+
+def anonymous_memory_bytes() -> int:
+    """Private (non file-backed) resident memory of this process."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("RssAnon not reported")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc/self/status")
+def test_search_adds_no_private_copy_of_matrix(tmp_path):
+    # 60 MB of vectors: a private copy per worker would show up as anonymous memory
+    persist_directory = tmp_path / "chroma_db"
+    writer = RAGmailVectorStore(str(persist_directory), use_embedding_cache=False, backend="numpy")
+    ids = [f"projects:p{i}" for i in range(20000)]
+    documents = [Document(page_content="", metadata={"doc_id": doc_id, "source": "projects"}) for doc_id in ids]
+    matrix = np.random.default_rng(0).normal(size=(len(ids), 768)).astype(np.float32)
+    NumpyVectorIndex(writer.index_directory).upsert(ids, matrix, documents)
+    del writer, documents, matrix
+
+    before = anonymous_memory_bytes()
+    store = open_read_only(persist_directory)
+    for seed in range(5):
+        query = np.random.default_rng(seed).normal(size=768).tolist()
+        store.vectorstore.similarity_search_by_vector(query, k=5, filter={"source": "projects"})
+    grown = anonymous_memory_bytes() - before
+
+    assert grown < store.vectorstore.matrix.nbytes // 4
@@ -0,0 +1,58 @@
+"""
+Tests that the API starts without the heavy stack (src/email_generator.py, backend/main.py).
+"""
+
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("langchain_groq", "chromadb", "sentence_transformers", "torch")
+
+# Runs in a fresh interpreter so modules imported by other tests don't count
+STARTUP_SCRIPT = """
+import os, sys, json
+import backend.main
+imported = [m for m in {heavy!r} if m in sys.modules]
+from src.email_generator import EmailGenerator
+generator = EmailGenerator()
+print(json.dumps({{
+    "after_import": imported,
+    "after_construct": [m for m in {heavy!r} if m in sys.modules],
+    "matcher_created": generator._matcher is not None,
+    "files": sorted(os.listdir("."))
+}}))
+""".format(heavy=HEAVY_MODULES)
+
+
+def run_startup(tmp_path) -> dict:
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT),
+        RAGMAIL_EMAIL_STORE="false",
+        RAGMAIL_LLM_CACHE="false",
+        RAGMAIL_PRELOAD="false"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=tmp_path, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_api_import_skips_heavy_modules(tmp_path):
+    startup = run_startup(tmp_path)
+
+    assert startup["after_import"] == []
+    assert startup["after_construct"] == []
+
+
+def test_generator_does_not_create_vector_store(tmp_path):
+    startup = run_startup(tmp_path)
+
+    assert not startup["matcher_created"]
+    assert "chroma_db" not in startup["files"]
+    assert "embedding_cache" not in startup["files"]